@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.services.vector_store import get_paper_review
+from app.services.ingestion import get_ingestion_status, STAGE_PROGRESS
+from app.services.review_progress import REVIEW_KEYS, current_scores
 
 router = APIRouter()
 
@@ -25,12 +27,32 @@ def get_review_status(paper_id: str):
     Returns processing status and progress.
     """
     try:
+        ingestion = get_ingestion_status(paper_id)
+        if ingestion and ingestion["stage"] == "failed":
+            return {
+                "status": "failed",
+                "stage": "failed",
+                "progress": ingestion["progress"],
+                "error": ingestion.get("error"),
+            }
+        if ingestion and ingestion["stage"] not in ("reviewing", "complete"):
+            # Still extracting/parsing/embedding/storing; no review can exist yet
+            return {
+                "status": "processing",
+                "stage": ingestion["stage"],
+                "progress": ingestion["progress"],
+            }
+
         review = get_paper_review(paper_id)
         print(f"[STATUS] Paper {paper_id}, Review: {review}")
         
         if not review:
             # Paper uploaded but review not complete yet
-            return {"status": "processing", "progress": 50}
+            return {
+                "status": "processing",
+                "stage": ingestion["stage"] if ingestion else "reviewing",
+                "progress": ingestion["progress"] if ingestion else 50,
+            }
         
         # Check if review has final decision and all section reviews populated
         final_decision = review.get("final_decision")
@@ -43,17 +65,26 @@ def get_review_status(paper_id: str):
         ])
         print(f"[STATUS] Final decision: {final_decision}")
         
-        if decision_value and str(decision_value).lower() != "pending" and has_all_sections:
+        # A finished review only counts once the paper's latest ingestion job is done too
+        # (a forced re-review runs under the same paper_id)
+        job_done = not ingestion or ingestion["status"] not in ("queued", "running")
+        if decision_value and str(decision_value).lower() != "pending" and has_all_sections and job_done:
             return {
                 "status": "complete",
                 "progress": 100,
                 "review": review
             }
         else:
-            # Still processing
+            # Still processing: node outputs are stored as each node finishes
+            completed = [key.removesuffix("_review") for key in REVIEW_KEYS if review.get(key)]
+            start, end = STAGE_PROGRESS["reviewing"], STAGE_PROGRESS["complete"]
             return {
                 "status": "processing",
-                "progress": 75
+                "stage": "reviewing",
+                # The critic's share is only reached on completion
+                "progress": start + (end - start - 5) * len(completed) // len(REVIEW_KEYS),
+                "completed_nodes": completed,
+                "scores": current_scores(review),
             }
     except Exception as e:
         print(f"[STATUS] Error: {e}")
@@ -1,10 +1,33 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from app.services.job_queue import get_job_queue
+from app.services.rate_limiter import rate_limit_status
 
 router = APIRouter()
 
+@router.get("/status")
+def service_status():
+    """Job queue counts and the remaining provider budget of each deployment (this process)."""
+    return {
+        "jobs": get_job_queue().counts(),
+        "rate_limits": rate_limit_status(),
+    }
+
 @router.get("/status/{job_id}")
 def check_status(job_id: str):
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     return {
         "job_id": job_id,
-        "status": "uploaded"
+        "paper_id": job["paper_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
     }
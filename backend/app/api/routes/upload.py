@@ -1,20 +1,14 @@
 import os
 import uuid
-import json
 import tempfile
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.pdf_loader import load_pdf_text
-from app.services.text_cleaner import clean_text
-from app.services.section_parser import parse_sections
-from app.services.embeddings import get_embedding
-from app.services.vector_store import store_paper, store_section, store_review
-from app.graph.graph import build_graph
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from app.services.job_queue import get_job_queue, QueueFullError
+from app.services.content_cache import hash_pdf, find_existing_upload, find_previous_upload, remember_upload, forget_review
+from app.graph.graph import REVIEW_MODES
 
 router = APIRouter()
-executor = ThreadPoolExecutor(max_workers=2)
 
 
 def _resolve_upload_dir() -> Path:
@@ -29,73 +23,80 @@ def _resolve_upload_dir() -> Path:
     upload_dir.mkdir(parents=True, exist_ok=True)
     return upload_dir
 
-def run_graph_sync(paper_id: str, paper_text: str, sections: dict):
-    """Run the graph synchronously in a thread pool."""
-    print(f"[GRAPH_WORKER] Starting review for paper_id: {paper_id}")
-    try:
-        compiled_graph = build_graph()
-        
-        initial_state = {
-            "paper_id": paper_id,
-            "paper_text": paper_text,
-            "paper_sections": sections,
-            "methodology_review": None,
-            "novelty_review": None,
-            "citation_review": None,
-            "clarity_review": None,
-            "final_decision": None,
-            "critic": {"status": "review", "retry_count": 0}
-        }
-        
-        # Execute the graph
-        print("[GRAPH_WORKER] Invoking graph...")
-        result = compiled_graph.invoke(initial_state)
-        print(f"[GRAPH_WORKER] Graph completed. Result keys: {result.keys()}")
-        
-        # Store the review results
-        print("[GRAPH_WORKER] Storing review results...")
-        store_review(paper_id, result)
-        print("[GRAPH_WORKER] Review stored successfully")
-    except Exception as e:
-        print(f"[GRAPH_WORKER] Error running review graph: {e}")
-        import traceback
-        traceback.print_exc()
+
+def _write_upload(file_path: Path, data: bytes) -> None:
+    """Persist the upload and flush it to disk before acknowledging the client."""
+    with open(file_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
 
 @router.post("/upload")
-async def upload_paper(file: UploadFile = File(...)):
+async def upload_paper(
+    file: UploadFile = File(...),
+    priority: int = Query(0),
+    force: bool = Query(False, description="Re-review even if this exact PDF was reviewed before"),
+    review_mode: str = Query(None, description="'fanout' (one LLM call per aspect) or 'combined' (one call)"),
+):
+    if review_mode is not None and review_mode not in REVIEW_MODES:
+        raise HTTPException(status_code=400, detail=f"review_mode must be one of: {', '.join(REVIEW_MODES)}")
     try:
-        job_id = str(uuid.uuid4())
-        upload_dir = _resolve_upload_dir()
-        file_path = upload_dir / f"{job_id}.pdf"
-
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        data = await file.read()
+        content_hash = hash_pdf(data)
 
-        raw_text = load_pdf_text(str(file_path))
-        cleaned = clean_text(raw_text)
-        sections = parse_sections(cleaned)
+        existing = await run_in_threadpool(find_existing_upload, content_hash)
+        # A forced re-review still joins an ingestion of the same PDF that is in progress
+        if existing and (not force or existing["status"] == "processing"):
+            print(f"[UPLOAD] Identical PDF already {existing['status']}: paper_id {existing['paper_id']}")
+            return {
+                "job_id": existing.get("job_id"),
+                "paper_id": existing["paper_id"],
+                "status": existing["status"],
+                "cached": True,
+            }
 
-        paper_id = store_paper(file.filename, str(file_path))
+        paper_id = None
+        if force:
+            await run_in_threadpool(forget_review, content_hash)
+            # Re-review under the same paper_id; ingestion replaces its sections and index entries
+            previous = await run_in_threadpool(find_previous_upload, content_hash)
+            paper_id = previous["paper_id"] if previous else None
 
-        for name, content in sections.items():
-            embedding = get_embedding(content)
-            store_section(paper_id, name, content, embedding)
+        job_id = str(uuid.uuid4())
+        paper_id = paper_id or str(uuid.uuid4())
+        upload_dir = _resolve_upload_dir()
+        file_path = upload_dir / f"{job_id}.pdf"
 
-        abstract = sections.get("abstract", "")
-        introduction = sections.get("introduction", "")
-        methodology = sections.get("methodology", "")
-        full_text = cleaned
-        paper_text = f"{abstract}\n\n{introduction}\n\n{methodology}\n\n{full_text}"
+        await run_in_threadpool(_write_upload, file_path, data)
 
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(executor, run_graph_sync, paper_id, paper_text, sections)
+        # Extraction, parsing, embedding, storage and review all run in job workers
+        await run_in_threadpool(
+            get_job_queue().enqueue,
+            "ingest_paper",
+            {
+                "paper_id": paper_id,
+                "title": file.filename,
+                "file_path": str(file_path),
+                "content_hash": content_hash,
+                "review_mode": review_mode,
+                # A forced re-review must reach the model, not replay cached responses
+                "use_cache": not force,
+            },
+            priority=priority,
+            job_id=job_id,
+            paper_id=paper_id,
+        )
+        await run_in_threadpool(remember_upload, content_hash, paper_id, job_id)
 
         return {
             "job_id": job_id,
             "paper_id": paper_id,
-            "sections_stored": list(sections.keys()),
-            "status": "processing"
+            "status": "processing",
+            "cached": False,
         }
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"[UPLOAD] Error: {e}")
         import traceback
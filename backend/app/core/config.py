@@ -17,3 +17,124 @@ AZURE_OPENAI_CHAT_DEPLOYMENT = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT", "gpt-4o
 AZURE_OPENAI_CHAT_API_VERSION = os.getenv("AZURE_OPENAI_CHAT_API_VERSION", "2024-10-21")
 AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-small")
 AZURE_OPENAI_EMBEDDING_API_VERSION = os.getenv("AZURE_OPENAI_EMBEDDING_API_VERSION", "2024-10-21")
+
+# Background job queue
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "thread")  # "thread" or "process"
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "900"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_QUEUE_MAX_PENDING = int(os.getenv("JOB_QUEUE_MAX_PENDING", "500"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+
+# PDF extraction
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_SLOW_PAGE_SECONDS = float(os.getenv("PDF_SLOW_PAGE_SECONDS", "2.0"))
+
+# Local caches
+CACHE_DIR = os.getenv("CACHE_DIR", "data/cache")
+CONTENT_CACHE_TTL_SECONDS = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Embedding batching
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "256"))
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))
+EMBED_STREAM_FLUSH_SECTIONS = int(os.getenv("EMBED_STREAM_FLUSH_SECTIONS", "4"))
+
+# Azure client registry
+AZURE_API_VERSION_REPROBE_SECONDS = float(os.getenv("AZURE_API_VERSION_REPROBE_SECONDS", "3600"))
+
+# Embedding cache
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "2048"))
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+EMBED_MAX_CONCURRENT_REQUESTS = int(os.getenv("EMBED_MAX_CONCURRENT_REQUESTS", "4"))
+EMBED_RENORMALIZE_CHUNKS = os.getenv("EMBED_RENORMALIZE_CHUNKS", "false").lower() in ("1", "true", "yes")
+
+# Similarity search
+SIMILARITY_SEARCH_MODE = os.getenv("SIMILARITY_SEARCH_MODE", "index")  # "index", "rpc" or "scan"
+SIMILARITY_INDEX_REFRESH_SECONDS = float(os.getenv("SIMILARITY_INDEX_REFRESH_SECONDS", "600"))
+SIMILARITY_INDEX_PAGE_SIZE = int(os.getenv("SIMILARITY_INDEX_PAGE_SIZE", "1000"))
+SIMILARITY_INDEX_BACKEND = os.getenv("SIMILARITY_INDEX_BACKEND", "exact")  # "exact" or "ivf"
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "")  # optional .npz snapshot for the IVF index
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_MIN_TRAIN_SIZE = int(os.getenv("IVF_MIN_TRAIN_SIZE", "5000"))
+IVF_TRAIN_SAMPLE = int(os.getenv("IVF_TRAIN_SAMPLE", "50000"))
+# Two-stage search: pick this many candidate papers by centroid, then rerank their sections (0 disables)
+SIMILARITY_CANDIDATE_PAPERS = int(os.getenv("SIMILARITY_CANDIDATE_PAPERS", "50"))
+# Section weights in each paper's centroid, "name:weight,..."
+PAPER_CENTROID_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, weight in (
+        item.split(":") for item in os.getenv("PAPER_CENTROID_WEIGHTS", "abstract:2,introduction:1,methodology:1").split(",") if item.strip()
+    )
+}
+# Section types novelty search compares against (references, acknowledgements and related work are skipped)
+NOVELTY_SECTION_TYPES = [
+    name.strip()
+    for name in os.getenv("NOVELTY_SECTION_TYPES", "abstract,introduction,methodology,results,conclusion,full_text").split(",")
+    if name.strip()
+]
+
+# Embedding storage: "" keeps only the pgvector column; "float32", "float16" or "int8" also
+# writes a packed base64 copy to paper_sections.embedding_packed (migrations/002_embedding_packed.sql)
+EMBEDDING_STORAGE_FORMAT = os.getenv("EMBEDDING_STORAGE_FORMAT", "")
+
+# Near-duplicate (MinHash/LSH) detection
+NEAR_DUPLICATE_INDEX_PATH = os.getenv("NEAR_DUPLICATE_INDEX_PATH", "data/near_duplicates.sqlite3")
+NEAR_DUPLICATE_SHINGLE_WORDS = int(os.getenv("NEAR_DUPLICATE_SHINGLE_WORDS", "5"))
+NEAR_DUPLICATE_PASSAGE_WORDS = int(os.getenv("NEAR_DUPLICATE_PASSAGE_WORDS", "200"))
+MINHASH_NUM_PERM = int(os.getenv("MINHASH_NUM_PERM", "128"))
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", "32"))  # 32 bands x 4 rows: candidates from ~0.4 Jaccard
+NEAR_DUPLICATE_REJECT_OVERLAP = float(os.getenv("NEAR_DUPLICATE_REJECT_OVERLAP", "0.9"))
+
+# Async LLM calls
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "64"))
+# Optional per-deployment caps, "deployment:limit,..." (deployments not listed share only the global limit)
+LLM_DEPLOYMENT_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.rsplit(":", 1) for item in os.getenv("LLM_DEPLOYMENT_CONCURRENCY", "").split(",") if item.strip()
+    )
+}
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "32"))
+
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+# LLM response cache (parsed JSON from review nodes). Sampled responses (temperature > 0)
+# differ from call to call, so the cache is only on by default at temperature 0.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true" if LLM_TEMPERATURE == 0 else "false").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512"))
+
+# Provider rate limits per deployment, "deployment:requests_per_minute:tokens_per_minute,..."
+# (0 or unlisted = unlimited). Shared by chat and embedding calls in this process.
+AZURE_RATE_LIMITS = {
+    name.strip(): (int(rpm), int(tpm))
+    for name, rpm, tpm in (
+        item.rsplit(":", 2) for item in os.getenv("AZURE_RATE_LIMITS", "").split(",") if item.strip()
+    )
+}
+# Retries for 429s, timeouts, connection errors and 5xx (jittered exponential backoff)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "60"))
+
+# Input token budget per review node (instructions + paper text), "node:tokens,..."
+PROMPT_TOKEN_BUDGETS = {
+    name.strip(): int(tokens)
+    for name, tokens in (
+        item.rsplit(":", 1)
+        for item in os.getenv("PROMPT_TOKEN_BUDGETS", "methodology:2800,citation:3800,clarity:4400,combined:4000").split(",")
+        if item.strip()
+    )
+}
+# tiktoken encoding used to count prompt tokens when tiktoken is installed (gpt-4o family);
+# without it, or if the encoding cannot be loaded, a local estimator is used
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "o200k_base")
+
+# Default review graph: "fanout" (one LLM call per aspect) or "combined" (one call for all
+# LLM-reviewed aspects); uploads can override it with ?review_mode=
+REVIEW_MODE = os.getenv("REVIEW_MODE", "fanout")
@@ -1,38 +1,65 @@
 from langgraph.graph import StateGraph, START, END
 
+from app.core.config import REVIEW_MODE
 from app.graph.state import GraphState
 from app.graph.nodes.methodology_node import methodology_node
 from app.graph.nodes.novelty_node import novelty_node
 from app.graph.nodes.citation_node import citation_node
 from app.graph.nodes.clarity_node import clarity_node
+from app.graph.nodes.combined_node import combined_review_node
 from app.graph.nodes.final_decision_node import final_decision_node
 
-def build_graph():
+# "fanout": one LLM call per aspect; "combined": one call for methodology, citation and clarity
+REVIEW_MODES = ("fanout", "combined")
+
+
+def build_graph(mode: str = None):
     """Build the review graph.
 
-    Flow:
+    Flow ("fanout", the default):
     START -> [methodology, novelty, citation, clarity] (parallel)
           -> critic/final_decision
           -> END
+
+    Flow ("combined"):
+    START -> [combined (methodology + citation + clarity), novelty] (parallel)
+          -> critic/final_decision
+          -> END
+
+    Both produce the same state keys. The LLM-backed review nodes are
+    coroutines: run the graph with ``ainvoke``.
+
+    Args:
+        mode: One of REVIEW_MODES; defaults to REVIEW_MODE
     """
-    print("[GRAPH] Building graph...")
+    mode = mode or REVIEW_MODE
+    if mode not in REVIEW_MODES:
+        raise ValueError(f"Unknown review mode '{mode}' (expected one of {', '.join(REVIEW_MODES)})")
+
+    print(f"[GRAPH] Building graph ({mode})...")
     graph = StateGraph(GraphState)
 
+    if mode == "combined":
+        review_nodes = {"combined": combined_review_node, "novelty": novelty_node}
+    else:
+        review_nodes = {
+            "methodology": methodology_node,
+            "novelty": novelty_node,
+            "citation": citation_node,
+            "clarity": clarity_node,
+        }
+
     # Add all review nodes
-    graph.add_node("methodology", methodology_node)
-    graph.add_node("novelty", novelty_node)
-    graph.add_node("citation", citation_node)
-    graph.add_node("clarity", clarity_node)
+    for name, node in review_nodes.items():
+        graph.add_node(name, node)
     graph.add_node("critic", final_decision_node)
 
     # Fan-out from START to all review nodes in parallel
-    graph.add_edge(START, "methodology")
-    graph.add_edge(START, "novelty")
-    graph.add_edge(START, "citation")
-    graph.add_edge(START, "clarity")
+    for name in review_nodes:
+        graph.add_edge(START, name)
 
     # Barrier join: critic executes only after ALL review nodes complete
-    graph.add_edge(["methodology", "novelty", "citation", "clarity"], "critic")
+    graph.add_edge(list(review_nodes), "critic")
 
     # Final judgment ends the graph
     graph.add_edge("critic", END)
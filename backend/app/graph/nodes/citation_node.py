@@ -1,4 +1,7 @@
-from app.services.llm_client import get_json_response
+from app.services.llm_client import aget_json_response
+from app.services.json_schema import REVIEW_SCHEMA
+from app.services.review_progress import score_publisher
+from app.services.prompt_budget import build_payload, payload_budget, count_tokens
 
 SYSTEM_PROMPT = """
 You are a strict peer reviewer focused ONLY on citation quality and literature grounding.
@@ -24,7 +27,7 @@ Return ONLY valid JSON:
 """
 
 
-def citation_node(state: dict) -> dict:
+async def citation_node(state: dict) -> dict:
     print("[CITATION] Starting...")
     sections = state.get("paper_sections", {})
 
@@ -44,13 +47,24 @@ def citation_node(state: dict) -> dict:
             }
         }
 
-    payload = (
-        f"Introduction (excerpt):\n{introduction[:3000]}\n\n"
-        f"Related Work (excerpt):\n{related_work[:6000]}\n\n"
-        f"References (excerpt):\n{references[:4000]}"
+    payload, _ = build_payload(
+        [
+            ("Introduction (excerpt)", introduction, 1.0),
+            ("Related Work (excerpt)", related_work, 2.0),
+            ("References (excerpt)", references, 1.5),
+        ],
+        payload_budget("citation", SYSTEM_PROMPT, "Paper text:"),
     )
+    prompt = f"{SYSTEM_PROMPT}\n\nPaper text:\n{payload}"
+    input_tokens = count_tokens(prompt)
 
-    response = get_json_response(f"{SYSTEM_PROMPT}\n\nPaper text:\n{payload}")
+    response = await aget_json_response(
+        prompt,
+        schema=REVIEW_SCHEMA,
+        schema_name="citation_review",
+        on_field=score_publisher(state, "citation"),
+        use_cache=state.get("use_cache", True),
+    )
     if isinstance(response, dict) and "error" not in response:
         score = max(0, min(10, float(response.get("score", 0))))
         return {
@@ -58,6 +72,7 @@ def citation_node(state: dict) -> dict:
                 "score": round(score, 1),
                 "issues": response.get("issues", [])[:6],
                 "suggestions": response.get("suggestions", [])[:6],
+                "input_tokens": input_tokens,
             }
         }
 
@@ -78,5 +93,6 @@ def citation_node(state: dict) -> dict:
             "score": max(1, score),
             "issues": issues,
             "suggestions": suggestions,
+            "input_tokens": input_tokens,
         }
     }
@@ -1,4 +1,7 @@
-from app.services.llm_client import get_json_response
+from app.services.llm_client import aget_json_response
+from app.services.json_schema import REVIEW_SCHEMA
+from app.services.review_progress import score_publisher
+from app.services.prompt_budget import build_payload, payload_budget, count_tokens
 
 SYSTEM_PROMPT = """
 You are a strict academic writing reviewer focused ONLY on clarity and structure.
@@ -24,7 +27,7 @@ Return ONLY valid JSON:
 """
 
 
-def clarity_node(state: dict) -> dict:
+async def clarity_node(state: dict) -> dict:
     print("[CLARITY] Starting...")
     sections = state.get("paper_sections", {})
 
@@ -34,15 +37,26 @@ def clarity_node(state: dict) -> dict:
     results = sections.get("results", "")
     conclusion = sections.get("conclusion", "")
 
-    payload = (
-        f"Abstract:\n{abstract[:2500]}\n\n"
-        f"Introduction:\n{introduction[:3500]}\n\n"
-        f"Methodology:\n{methodology[:3500]}\n\n"
-        f"Results:\n{results[:3500]}\n\n"
-        f"Conclusion:\n{conclusion[:2500]}"
+    payload, _ = build_payload(
+        [
+            ("Abstract", abstract, 1.0),
+            ("Introduction", introduction, 1.4),
+            ("Methodology", methodology, 1.4),
+            ("Results", results, 1.4),
+            ("Conclusion", conclusion, 1.0),
+        ],
+        payload_budget("clarity", SYSTEM_PROMPT, "Paper text:"),
     )
+    prompt = f"{SYSTEM_PROMPT}\n\nPaper text:\n{payload}"
+    input_tokens = count_tokens(prompt)
 
-    response = get_json_response(f"{SYSTEM_PROMPT}\n\nPaper text:\n{payload}")
+    response = await aget_json_response(
+        prompt,
+        schema=REVIEW_SCHEMA,
+        schema_name="clarity_review",
+        on_field=score_publisher(state, "clarity"),
+        use_cache=state.get("use_cache", True),
+    )
     if isinstance(response, dict) and "error" not in response:
         score = max(0, min(10, float(response.get("score", 0))))
         return {
@@ -50,6 +64,7 @@ def clarity_node(state: dict) -> dict:
                 "score": round(score, 1),
                 "issues": response.get("issues", [])[:6],
                 "suggestions": response.get("suggestions", [])[:6],
+                "input_tokens": input_tokens,
             }
         }
 
@@ -72,5 +87,6 @@ def clarity_node(state: dict) -> dict:
             "score": score,
             "issues": issues,
             "suggestions": suggestions,
+            "input_tokens": input_tokens,
         }
     }
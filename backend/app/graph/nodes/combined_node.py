@@ -0,0 +1,138 @@
+import asyncio
+
+from app.services.llm_client import aget_json_response
+from app.services.json_schema import REVIEW_SCHEMA, object_schema
+from app.services.review_progress import score_publisher
+from app.services.prompt_budget import build_payload, payload_budget, count_tokens
+from app.graph.nodes.methodology_node import methodology_node
+from app.graph.nodes.citation_node import citation_node
+from app.graph.nodes.clarity_node import clarity_node
+
+SYSTEM_PROMPT = """
+You are a strict academic peer reviewer. Review the paper on three independent aspects.
+
+methodology: research design only (not novelty or writing). Penalize missing experimental
+detail, missing baselines and weak evaluation design; allow partial credit for methods
+that are described but lack depth.
+- 9-10: rigorous, reproducible, strong experimental controls
+- 7-8: good with minor gaps
+- 5-6: moderate weaknesses but usable
+- 3-4: serious weaknesses that threaten validity
+- 0-2: fundamentally weak or non-reproducible
+
+citation: prior work coverage, relevance of citation context, recent work (last 3-5 years),
+and whether claims are supported by references.
+- 9-10: comprehensive, current, well-integrated
+- 7-8: good with some gaps
+- 4-6: missing important references
+- 0-3: poor or largely absent citation support
+
+clarity: logical flow from problem to contribution, precise language, understandable claims,
+section coherence.
+- 9-10: clear, coherent, publication-ready
+- 7-8: mostly clear with minor defects
+- 4-6: clarity issues that hurt comprehension
+- 0-3: confusing, fragmented or highly ambiguous
+
+Judge each aspect on its own; do not let one aspect's score influence another.
+
+Return ONLY valid JSON with one object per requested aspect:
+{
+  "<aspect>": {"score": number (0 to 10), "issues": [string], "suggestions": [string]}
+}
+"""
+
+# (label, section name, priority) - every section is sent once
+SECTIONS = (
+    ("Abstract", "abstract", 1.0),
+    ("Introduction", "introduction", 1.4),
+    ("Related Work", "related_work", 1.4),
+    ("Methodology", "methodology", 2.0),
+    ("Results", "results", 1.4),
+    ("Conclusion", "conclusion", 1.0),
+    ("References", "references", 1.0),
+)
+
+# aspect -> (state key, fan-out node used for the no-LLM short cuts and for fallbacks)
+ASPECTS = {
+    "methodology": ("methodology_review", methodology_node),
+    "citation": ("citation_review", citation_node),
+    "clarity": ("clarity_review", clarity_node),
+}
+
+
+def _needs_llm(aspect: str, sections) -> bool:
+    # Mirrors the early returns of the fan-out nodes, which answer without a model call
+    if aspect == "methodology":
+        return bool(sections.get("methodology", "").strip())
+    if aspect == "citation":
+        return bool(sections.get("related_work", "").strip() or sections.get("references", "").strip())
+    return True
+
+
+def _aspect_review(response: dict, input_tokens: int) -> dict:
+    """Normalized review for one aspect, or None if the model left it out or malformed it."""
+    if not isinstance(response, dict):
+        return None
+    try:
+        score = max(0, min(10, float(response.get("score"))))
+    except (TypeError, ValueError):
+        return None
+    return {
+        "score": round(score, 1),
+        "issues": list(response.get("issues") or [])[:6],
+        "suggestions": list(response.get("suggestions") or [])[:6],
+        "input_tokens": input_tokens,
+        "combined": True,
+    }
+
+
+async def combined_review_node(state: dict) -> dict:
+    """Methodology, citation and clarity reviews from a single model call.
+
+    Each section is sent once instead of once per aspect. Aspects the fan-out
+    nodes answer without a model call (missing methodology, no references)
+    keep those answers; an aspect missing from the combined response falls
+    back to its fan-out node.
+    """
+    print("[COMBINED] Starting...")
+    sections = state.get("paper_sections", {})
+    requested = [aspect for aspect in ASPECTS if _needs_llm(aspect, sections)]
+    reviews = {}
+
+    if requested:
+        payload, _ = build_payload(
+            [(label, sections.get(name, ""), priority) for label, name, priority in SECTIONS],
+            payload_budget("combined", SYSTEM_PROMPT, "Aspects to review:", "Paper text:"),
+        )
+        prompt = f"{SYSTEM_PROMPT}\n\nAspects to review: {', '.join(requested)}\n\nPaper text:\n{payload}"
+        input_tokens = count_tokens(prompt)
+
+        response = await aget_json_response(
+            prompt,
+            max_tokens=2500,
+            schema=object_schema({aspect: REVIEW_SCHEMA for aspect in requested}),
+            schema_name="combined_review",
+            on_field=score_publisher(state, "combined"),
+            use_cache=state.get("use_cache", True),
+        )
+        if isinstance(response, dict) and "error" not in response:
+            for aspect in requested:
+                review = _aspect_review(response.get(aspect), input_tokens)
+                if review is not None:
+                    reviews[ASPECTS[aspect][0]] = review
+        else:
+            print(f"[COMBINED] Combined call failed: {response.get('error') if isinstance(response, dict) else response}")
+
+    missing = [aspect for aspect in ASPECTS if ASPECTS[aspect][0] not in reviews]
+    if missing:
+        failed = [aspect for aspect in missing if aspect in requested]
+        if failed:
+            print(f"[COMBINED] Falling back to per-aspect nodes for: {', '.join(failed)}")
+        for result in await asyncio.gather(*(ASPECTS[aspect][1](state) for aspect in missing)):
+            reviews.update(result)
+
+    print("[COMBINED] Completed with scores: " + ", ".join(
+        f"{aspect}={reviews[key].get('score')}" for aspect, (key, _) in ASPECTS.items()
+    ))
+    return reviews
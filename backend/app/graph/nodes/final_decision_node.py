@@ -1,3 +1,6 @@
+from app.core.config import NEAR_DUPLICATE_REJECT_OVERLAP
+
+
 def final_decision_node(state: dict) -> dict:
     """Critic node that validates reviews and decides to retry or finalize."""
     print("[CRITIC] Starting...")
@@ -39,6 +42,10 @@ def final_decision_node(state: dict) -> dict:
         issues.append("Critical: Extremely high similarity to existing work (possible overlap/plagiarism risk).")
         retry_needed = True
 
+    if novelty.get("overlap", 0.0) >= NEAR_DUPLICATE_REJECT_OVERLAP:
+        issues.append("Critical: Passages nearly identical to an existing paper (possible plagiarism).")
+        retry_needed = True
+
     # If issues found and retries available, trigger retry
     # retries counter tracks how many times we've retried (0 = first attempt, 1 = first retry, 2 = second retry)
     if retry_needed and retries < max_retries:
@@ -106,11 +113,13 @@ def final_decision_node(state: dict) -> dict:
     citation_score = citation.get("score", 0)
     clarity_score = clarity.get("score", 0)
     max_similarity = novelty.get("similarity_max", 0.0)
+    overlap = novelty.get("overlap", 0.0)
 
     hard_reject = (
         methodology_score <= 3
         or citation_score <= 2
         or max_similarity >= 0.99
+        or overlap >= NEAR_DUPLICATE_REJECT_OVERLAP
     )
 
     # Stricter decision policy
@@ -123,6 +132,8 @@ def final_decision_node(state: dict) -> dict:
             issues.append("Hard reject: insufficient literature grounding.")
         if max_similarity >= 0.97:
             issues.append("Hard reject: near-duplicate similarity detected.")
+        if overlap >= NEAR_DUPLICATE_REJECT_OVERLAP:
+            issues.append(f"Hard reject: {overlap:.0%} passage overlap with an existing paper.")
     elif avg_score >= 8.0 and min(methodology_score, novelty_score, citation_score, clarity_score) >= 6.5:
         decision = "Accept"
         confidence = "High"
@@ -1,6 +1,7 @@
-import json
-import re
-from app.services.llm_client import get_json_response
+from app.services.llm_client import aget_json_response
+from app.services.json_schema import REVIEW_SCHEMA
+from app.services.review_progress import score_publisher
+from app.services.prompt_budget import payload_budget, trim_to_tokens, count_tokens
 
 SYSTEM_PROMPT = """
 You are an academic peer reviewer specializing in research methodology.
@@ -31,28 +32,7 @@ JSON schema:
 """
 
 
-def _extract_json(text: str) -> dict:
-    """Extract the first JSON object from text safely."""
-    try:
-        return json.loads(text)
-    except Exception:
-        # Strip code fences if present
-        cleaned = re.sub(r"^```(json)?|```$", "", text.strip())
-        # Find first {...} block
-        match = re.search(r"\{[\s\S]*\}", cleaned)
-        if match:
-            try:
-                return json.loads(match.group(0))
-            except Exception:
-                pass
-        return {
-            "score": 0.0,
-            "issues": ["Invalid JSON from model."],
-            "suggestions": ["Ensure strict JSON-only responses or check API key."]
-        }
-
-
-def methodology_node(state: dict) -> dict:
+async def methodology_node(state: dict) -> dict:
     print("[METHODOLOGY] Starting...")
     methodology_text = state.get("paper_sections", {}).get("methodology", "")
 
@@ -65,11 +45,19 @@ def methodology_node(state: dict) -> dict:
             }
         }
 
-    methodology_excerpt = methodology_text[:9000]
-    prompt = f"{SYSTEM_PROMPT}\n\nMethodology section (excerpt):\n{methodology_excerpt}"
+    label = "Methodology section (excerpt):"
+    methodology_excerpt = trim_to_tokens(methodology_text.strip(), payload_budget("methodology", SYSTEM_PROMPT, label))
+    prompt = f"{SYSTEM_PROMPT}\n\n{label}\n{methodology_excerpt}"
 
     try:
-        response = get_json_response(prompt, system_prompt=None)
+        response = await aget_json_response(
+            prompt,
+            system_prompt=None,
+            schema=REVIEW_SCHEMA,
+            schema_name="methodology_review",
+            on_field=score_publisher(state, "methodology"),
+            use_cache=state.get("use_cache", True),
+        )
         
         if "error" in response:
             parsed = {
@@ -86,5 +74,6 @@ def methodology_node(state: dict) -> dict:
             "suggestions": ["Ensure the AZURE_OPENAI_API_KEY and endpoint are set and valid."]
         }
 
+    parsed = {**parsed, "input_tokens": count_tokens(prompt)}
     print(f"[METHODOLOGY] Completed with score: {parsed.get('score')}")
     return {"methodology_review": parsed}
@@ -1,35 +1,79 @@
-from app.services.embeddings import get_embedding
-from app.services.retrieval import search_similar_sections
+from app.services.embeddings import get_embeddings
+from app.services.retrieval import search_similar_sections_batch
+from app.services.near_duplicate import get_near_duplicate_index
+from app.core.config import NOVELTY_SECTION_TYPES
 
 SIMILARITY_THRESHOLD = 0.80
 
+# Sections compared like-for-like against the same section type of other papers
+PER_SECTION_NOVELTY = ("methodology", "results", "conclusion")
+
+
+def build_novelty_query(sections) -> str:
+    """Text embedded as the novelty query (also pre-embedded at ingestion)."""
+    return (
+        sections.get("abstract", "") + "\n" +
+        sections.get("introduction", "")
+    ).strip()
+
+
+def _passage_overlap(paper_id: str, sections, content_hash: str = None) -> dict:
+    """Largest share of any other paper's passage that reappears in this one."""
+    try:
+        return get_near_duplicate_index().find_overlap(paper_id or None, sections, content_hash=content_hash)
+    except Exception as e:
+        print(f"[NOVELTY] Near-duplicate check failed: {e}")
+        return {"overlap": 0.0, "matches": []}
+
+
+def _earlier_copies(paper_id: str, content_hash: str) -> list[str]:
+    """Other paper_ids ingested from the same PDF; they are copies, not prior work."""
+    if not content_hash:
+        return []
+    try:
+        paper_ids = get_near_duplicate_index().papers_with_content(content_hash)
+    except Exception as e:
+        print(f"[NOVELTY] Could not look up earlier copies: {e}")
+        return []
+    return [other for other in paper_ids if other.lower() != paper_id.lower()]
+
 
 def novelty_node(state: dict) -> dict:
     print("[NOVELTY] Starting...")
     sections = state.get("paper_sections", {})
     paper_id = str(state.get("paper_id", "")).strip()  # Current paper ID to exclude self
 
-    text_for_novelty = (
-        sections.get("abstract", "") + "\n" +
-        sections.get("introduction", "")
-    ).strip()
+    text_for_novelty = build_novelty_query(sections)
+    overlap = _passage_overlap(paper_id, sections, state.get("content_hash"))
 
     if not text_for_novelty:
         return {
             "novelty_review": {
                 "score": 0,
                 "similarity_max": 1.0,
+                "overlap": overlap["overlap"],
+                "overlap_matches": overlap["matches"],
                 "issues": ["No abstract or introduction found for novelty analysis."],
                 "suggestions": ["Ensure the paper includes an abstract and introduction."]
             }
         }
 
-    query_embedding = get_embedding(text_for_novelty)
-    results = search_similar_sections(
-        query_embedding,
+    # One query for the paper as a whole plus one per section type; the section
+    # texts were embedded at ingestion, so these embeddings come from the cache
+    compared_sections = [name for name in PER_SECTION_NOVELTY if sections.get(name, "").strip()]
+    query_embeddings = get_embeddings([text_for_novelty] + [sections[name] for name in compared_sections])
+    all_results = search_similar_sections_batch(
+        query_embeddings,
         top_k=10,
-        exclude_paper_id=paper_id if paper_id else None
+        exclude_paper_id=paper_id if paper_id else None,
+        section_types=[NOVELTY_SECTION_TYPES] + [[name] for name in compared_sections],
+        exclude_paper_ids=_earlier_copies(paper_id, state.get("content_hash")),
     )
+    results = all_results[0]
+    section_similarity = {
+        name: round(max((r["similarity"] for r in section_results), default=0.0), 2)
+        for name, section_results in zip(compared_sections, all_results[1:])
+    }
 
     if paper_id:
         normalized_pid = paper_id.lower()
@@ -42,6 +86,9 @@ def novelty_node(state: dict) -> dict:
             "novelty_review": {
                 "score": 9,
                 "similarity_max": 0.0,
+                "section_similarity": section_similarity,
+                "overlap": overlap["overlap"],
+                "overlap_matches": overlap["matches"],
                 "issues": [],
                 "suggestions": [
                     "First paper in the system - novelty cannot be compared.",
@@ -69,12 +116,30 @@ def novelty_node(state: dict) -> dict:
             "Compare contributions clearly against prior work."
         ]
 
-    print(f"[NOVELTY] Completed with score: {score}, max_similarity: {max_similarity:.2f}")
+    similar_sections = [name for name, similarity in section_similarity.items() if similarity > SIMILARITY_THRESHOLD]
+    for name in similar_sections:
+        issues.append(
+            f"The {name} section closely resembles the {name} of existing work ({section_similarity[name]:.2f})."
+        )
+    if similar_sections and score > 5:
+        # Overall framing is new but parts of the work are not
+        score = 5
+        suggestions.append("Explain what is new in the " + ", ".join(similar_sections) + " relative to prior work.")
+
+    if overlap["overlap"] >= 0.5:
+        issues.append(
+            f"Passage overlap of {overlap['overlap']:.2f} with an existing paper ({overlap['matches'][0]['matched_section']} section)."
+        )
+
+    print(f"[NOVELTY] Completed with score: {score}, max_similarity: {max_similarity:.2f}, overlap: {overlap['overlap']:.2f}")
 
     return {
         "novelty_review": {
             "score": score,
             "similarity_max": round(max_similarity, 2),
+            "section_similarity": section_similarity,
+            "overlap": overlap["overlap"],
+            "overlap_matches": overlap["matches"],
             "issues": issues,
             "suggestions": suggestions
         }
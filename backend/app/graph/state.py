@@ -1,8 +1,16 @@
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, Mapping, Any
 
 class GraphState(TypedDict, total=False):
     paper_id: str
-    paper_sections: Dict[str, str]
+    # ParsedPaper (cleaned text + section offsets) or a plain {name: content} dict
+    paper_sections: Mapping[str, str]
+    review_mode: str
+    # Pending review record that node outputs are logged to as they finish
+    review_id: str
+    # SHA-256 of the uploaded PDF; earlier copies of it are not overlaps
+    content_hash: str
+    # False for forced re-reviews, which must not be answered from the LLM response cache
+    use_cache: bool
     methodology_review: Any
     novelty_review: Any
     citation_review: Any
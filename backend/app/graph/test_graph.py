@@ -1,4 +1,5 @@
 from app.graph.graph import build_graph
+import asyncio
 import json
 
 # Test case 1: Good paper that should pass
@@ -17,7 +18,7 @@ state_good = {
 }
 
 graph = build_graph()
-result_good = graph.invoke(state_good)
+result_good = asyncio.run(graph.ainvoke(state_good))
 
 print(json.dumps({
     "methodology_review": result_good.get("methodology_review"),
@@ -44,7 +45,7 @@ state_poor = {
     }
 }
 
-result_poor = graph.invoke(state_poor)
+result_poor = asyncio.run(graph.ainvoke(state_poor))
 
 print(json.dumps({
     "methodology_review": result_poor.get("methodology_review"),
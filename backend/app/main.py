@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import APP_NAME
 from app.api.routes import status, review, upload
+from app.services.job_queue import JobWorkerPool
 
-app = FastAPI(title=APP_NAME)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workers drain the durable queue, including jobs left over from a previous run
+    worker_pool = JobWorkerPool()
+    worker_pool.start()
+    try:
+        yield
+    finally:
+        worker_pool.stop()
+
+app = FastAPI(title=APP_NAME, lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
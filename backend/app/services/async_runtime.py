@@ -0,0 +1,36 @@
+"""Process-wide event loop for running async work from synchronous code.
+
+Job workers are plain threads (or processes); they hand coroutines such as a
+review graph's ``ainvoke`` to one long-lived loop running in a daemon thread.
+All reviews in the process therefore share that loop's async HTTP clients,
+connection pools and concurrency limits, and a worker thread only waits on a
+future instead of blocking on each HTTP call.
+"""
+import asyncio
+import threading
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared loop, starting its thread on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def run_async(coro, timeout: float = None):
+    """Run a coroutine on the shared loop and block until it finishes.
+
+    Must not be called from the loop's own thread (it would deadlock).
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("run_async() called from the async runtime thread; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
@@ -0,0 +1,114 @@
+"""Shared registry of long-lived Azure OpenAI clients.
+
+Each client owns an HTTP connection pool, so one client is kept per
+(endpoint, api_version, purpose) and reused across calls. The registry also
+remembers which API version last worked for each purpose, so later calls go
+straight to it instead of walking the candidate list from the top. Every
+AZURE_API_VERSION_REPROBE_SECONDS the full candidate order is tried again so
+a preferred version that becomes available is picked up.
+
+Async clients are bound to the event loop they were created on, so they are
+kept per loop (normally the single loop of ``app.services.async_runtime``)
+and share one keep-alive connection pool per (endpoint, api_version, purpose).
+
+The SDK's own retries are disabled (``max_retries=0``); retries and backoff
+are handled by ``app.services.rate_limiter`` so they respect the shared budget.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+from openai import AzureOpenAI, AsyncAzureOpenAI, DefaultAsyncHttpxClient
+from app.core.config import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_API_VERSION_REPROBE_SECONDS,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_KEEPALIVE_CONNECTIONS,
+)
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_working_versions = {}
+
+
+def get_client(purpose: str, api_version: str) -> AzureOpenAI:
+    """Return the shared client for a purpose ("chat", "embeddings", ...) and API version."""
+    key = (AZURE_OPENAI_ENDPOINT, api_version, purpose)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = AzureOpenAI(
+                api_key=AZURE_OPENAI_API_KEY,
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                api_version=api_version,
+                max_retries=0,
+            )
+            _clients[key] = client
+        return client
+
+
+def get_async_client(purpose: str, api_version: str) -> AsyncAzureOpenAI:
+    """Async counterpart of ``get_client`` for the running event loop."""
+    loop = asyncio.get_running_loop()
+    key = (AZURE_OPENAI_ENDPOINT, api_version, purpose)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncAzureOpenAI(
+                api_key=AZURE_OPENAI_API_KEY,
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                api_version=api_version,
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=max(LLM_MAX_CONCURRENT_REQUESTS, 1),
+                        max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+                    )
+                ),
+            )
+            clients[key] = client
+        return client
+
+
+def api_versions_to_try(purpose: str, candidates: list[str]) -> list[str]:
+    """Order candidate API versions, putting the remembered working version first.
+
+    When the remembered version is older than the re-probe interval the
+    original candidate order is returned so preferred versions are re-checked.
+    """
+    with _lock:
+        remembered = _working_versions.get(purpose)
+        if not remembered:
+            return list(candidates)
+
+        version, remembered_at = remembered
+        if version not in candidates:
+            return list(candidates)
+        if time.time() - remembered_at > AZURE_API_VERSION_REPROBE_SECONDS:
+            # This call re-probes in preferred order; others keep the fast path until the next interval
+            _working_versions[purpose] = (version, time.time())
+            return list(candidates)
+    return [version] + [candidate for candidate in candidates if candidate != version]
+
+
+def remember_api_version(purpose: str, api_version: str) -> None:
+    """Record a version that just served a request successfully."""
+    with _lock:
+        current = _working_versions.get(purpose)
+        # Keep the timestamp while the same version keeps working so re-probes still happen
+        if current and current[0] == api_version:
+            return
+        _working_versions[purpose] = (api_version, time.time())
+
+
+def forget_api_version(purpose: str, api_version: str) -> None:
+    """Drop a remembered version after it returned NotFound."""
+    with _lock:
+        current = _working_versions.get(purpose)
+        if current and current[0] == api_version:
+            del _working_versions[purpose]
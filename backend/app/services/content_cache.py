@@ -0,0 +1,101 @@
+"""Content-addressed cache of ingestion artifacts keyed by the PDF's SHA-256.
+
+For each distinct PDF we remember the paper it was ingested as, its cleaned
+text, parsed sections, section embeddings and the finished review, so a
+byte-identical resubmission can skip the whole pipeline.
+"""
+import hashlib
+import threading
+from pathlib import Path
+
+from app.core.config import CACHE_DIR, CONTENT_CACHE_TTL_SECONDS, CONTENT_CACHE_MAX_BYTES
+from app.services.cache_store import TwoTierCache
+from app.services.job_queue import get_job_queue
+from app.services.section_parser import ParsedPaper
+from app.services.embedding_codec import encode_embedding, decode_embedding
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> TwoTierCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TwoTierCache(
+                Path(CACHE_DIR) / "content.sqlite3",
+                max_memory_items=64,
+                max_disk_bytes=CONTENT_CACHE_MAX_BYTES,
+                ttl_seconds=CONTENT_CACHE_TTL_SECONDS,
+            )
+        return _cache
+
+
+def hash_pdf(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def remember_upload(content_hash: str, paper_id: str, job_id: str) -> None:
+    """Point the content hash at the paper currently being ingested for it."""
+    _get_cache().set_json(f"{content_hash}:paper", {"paper_id": paper_id, "job_id": job_id})
+
+
+def find_previous_upload(content_hash: str) -> dict:
+    """Return the {"paper_id", "job_id"} an identical PDF was last ingested as, or None."""
+    return _get_cache().get_json(f"{content_hash}:paper")
+
+
+def find_existing_upload(content_hash: str) -> dict:
+    """Return the paper an identical PDF was (or is being) ingested as.
+
+    Returns:
+        {"paper_id", "job_id", "status"} where status is "complete" when the
+        review is cached, or "processing" when its ingestion job is still
+        queued/running. None when the upload has to be processed again.
+    """
+    cache = _get_cache()
+    record = cache.get_json(f"{content_hash}:paper")
+    if not record:
+        return None
+
+    if cache.get_json(f"{content_hash}:review") is not None:
+        return {**record, "status": "complete"}
+
+    job = get_job_queue().get(record["job_id"]) if record.get("job_id") else None
+    if job and job["status"] in ("queued", "running"):
+        return {**record, "status": "processing"}
+    return None
+
+
+def get_artifacts(content_hash: str) -> dict:
+    """Return the cached parsed paper and section embeddings for a PDF, or None if incomplete."""
+    cache = _get_cache()
+    paper = cache.get_json(f"{content_hash}:paper_text")
+    embeddings = cache.get_json(f"{content_hash}:embeddings")
+    if paper is None or embeddings is None:
+        return None
+    paper = ParsedPaper.from_dict(paper)
+    if set(paper) != set(embeddings):
+        return None
+    vectors = {name: decode_embedding(value) for name, value in embeddings.items()}
+    if any(vector is None for vector in vectors.values()):
+        return None
+    embeddings = {name: vector.tolist() for name, vector in vectors.items()}
+    return {"paper": paper, "embeddings": embeddings}
+
+
+def store_artifacts(content_hash: str, paper: ParsedPaper, embeddings: dict) -> None:
+    cache = _get_cache()
+    # Cleaned text plus section offsets; sections are sliced back out on load
+    cache.set_json(f"{content_hash}:paper_text", paper.to_dict())
+    # Packed float32 is ~3x smaller than a JSON float list and decodes without parsing
+    cache.set_json(f"{content_hash}:embeddings", {name: encode_embedding(vector) for name, vector in embeddings.items()})
+
+
+def store_review_result(content_hash: str, review: dict) -> None:
+    _get_cache().set_json(f"{content_hash}:review", review)
+
+
+def forget_review(content_hash: str) -> None:
+    """Drop the cached review so the next identical upload is reviewed again."""
+    _get_cache().delete(f"{content_hash}:review")
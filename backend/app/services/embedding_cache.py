@@ -0,0 +1,59 @@
+"""Embedding cache keyed by (deployment, hash of whitespace-normalized text).
+
+Vectors are stored as float32 blobs in a two-tier cache: a bounded in-memory
+LRU in front of a SQLite file under CACHE_DIR with size-based eviction.
+"""
+import hashlib
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import CACHE_DIR, EMBED_CACHE_ENABLED, EMBED_CACHE_MEMORY_ITEMS, EMBED_CACHE_MAX_BYTES
+from app.services.cache_store import TwoTierCache
+
+_WHITESPACE = re.compile(r"\s+")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> TwoTierCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TwoTierCache(
+                Path(CACHE_DIR) / "embeddings.sqlite3",
+                max_memory_items=EMBED_CACHE_MEMORY_ITEMS,
+                max_disk_bytes=EMBED_CACHE_MAX_BYTES,
+            )
+        return _cache
+
+
+def _cache_key(deployment: str, text: str) -> str:
+    normalized = _WHITESPACE.sub(" ", text).strip()
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{deployment}:{digest}"
+
+
+def get_cached_embedding(deployment: str, text: str) -> list[float]:
+    if not EMBED_CACHE_ENABLED:
+        return None
+    value = _get_cache().get(_cache_key(deployment, text))
+    if value is None:
+        return None
+    return np.frombuffer(value, dtype=np.float32).tolist()
+
+
+def cache_embedding(deployment: str, text: str, vector: list[float]) -> None:
+    if not EMBED_CACHE_ENABLED or not vector:
+        return
+    _get_cache().set(_cache_key(deployment, text), np.asarray(vector, dtype=np.float32).tobytes())
+
+
+def embedding_cache_stats() -> dict:
+    """Hit/miss counters and tier sizes."""
+    if not EMBED_CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **_get_cache().stats()}
@@ -0,0 +1,167 @@
+"""Compact binary encoding for embedding vectors.
+
+Packed embeddings are ASCII strings ``"<format>:<base64>"`` so they fit in a
+text column and in JSON payloads:
+
+- ``f32``: raw little-endian float32
+- ``f16``: float16 (half the size, ~3 significant digits)
+- ``i8``: symmetric int8 quantization; the first 4 bytes hold the float32 scale
+
+Decoding goes straight into a NumPy buffer, several times faster than
+parsing the float text. The pgvector text form (``"[0.1,0.2,...]"``) is also
+accepted; ``decode_embeddings`` parses a whole page of such strings with a
+single ``np.fromstring`` call instead of one ``json.loads`` plus list-to-array
+conversion per row. ``np.fromstring`` reads an empty trailing field as -1
+instead of failing, so such bodies are rejected before parsing, and decoded
+vectors can be checked against the expected dimension.
+"""
+import base64
+
+import numpy as np
+
+PACKED_FORMATS = {"float32": "f32", "float16": "f16", "int8": "i8"}
+_PACKED_PREFIXES = tuple(f"{tag}:" for tag in PACKED_FORMATS.values())
+
+
+def encode_embedding(embedding, fmt: str = "float32") -> str:
+    """Pack an embedding into a base64 string.
+
+    Args:
+        embedding: Sequence or array of floats
+        fmt: "float32", "float16" or "int8"
+
+    Returns:
+        The packed ``"<tag>:<base64>"`` string
+    """
+    tag = PACKED_FORMATS.get(fmt)
+    if tag is None:
+        raise ValueError(f"Unsupported embedding format '{fmt}' (expected one of {sorted(PACKED_FORMATS)})")
+    vector = np.asarray(embedding, dtype=np.float32)
+    if tag == "f32":
+        raw = vector.astype("<f4").tobytes()
+    elif tag == "f16":
+        raw = vector.astype("<f2").tobytes()
+    else:
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        raw = np.float32(scale).astype("<f4").tobytes() + quantized.tobytes()
+    return f"{tag}:{base64.b64encode(raw).decode('ascii')}"
+
+
+def _decode_packed(value: str) -> np.ndarray:
+    tag, _, payload = value.partition(":")
+    raw = base64.b64decode(payload)
+    if tag == "f32":
+        return np.frombuffer(raw, dtype="<f4").astype(np.float32)
+    if tag == "f16":
+        return np.frombuffer(raw, dtype="<f2").astype(np.float32)
+    if tag == "i8":
+        scale = np.frombuffer(raw[:4], dtype="<f4")[0]
+        return np.frombuffer(raw[4:], dtype=np.int8).astype(np.float32) * scale
+    raise ValueError(f"Unknown packed embedding format '{tag}'")
+
+
+def is_packed(value) -> bool:
+    return isinstance(value, str) and value.startswith(_PACKED_PREFIXES)
+
+
+def _text_body(value: str) -> str:
+    """The comma-separated numbers of a pgvector/JSON text embedding, or None if it cannot be one."""
+    body = value.strip()
+    if body.startswith("[") and body.endswith("]"):
+        body = body[1:-1].strip()
+    # np.fromstring would turn a trailing empty field into -1 without complaint
+    if not body or body.endswith(","):
+        return None
+    return body
+
+
+def _checked(vector: np.ndarray, dim: int = None) -> np.ndarray:
+    if vector is None or vector.ndim != 1 or not vector.size:
+        return None
+    if dim is not None and vector.shape[0] != dim:
+        return None
+    if not np.isfinite(vector).all():
+        return None
+    return vector
+
+
+def decode_embedding(value, dim: int = None) -> np.ndarray:
+    """Decode one embedding (packed string, pgvector text, JSON list or array) to float32.
+
+    Args:
+        value: The stored embedding
+        dim: Expected length; vectors of any other length are rejected
+
+    Returns None for missing, unparsable, non-finite or wrongly sized values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, np.ndarray):
+        vector = value.astype(np.float32, copy=False)
+    elif isinstance(value, str):
+        if is_packed(value):
+            try:
+                vector = _decode_packed(value)
+            except ValueError:
+                return None
+        else:
+            body = _text_body(value)
+            if body is None:
+                return None
+            try:
+                vector = np.fromstring(body, dtype=np.float32, sep=",")
+            except ValueError:
+                return None
+    else:
+        try:
+            vector = np.asarray(value, dtype=np.float32)
+        except (TypeError, ValueError):
+            return None
+    return _checked(vector, dim)
+
+
+def decode_embeddings(values: list, dim: int = None) -> list:
+    """Decode a batch of embeddings, parsing pgvector/JSON text in one pass.
+
+    Args:
+        values: Embeddings as returned by Supabase (any form accepted by
+            ``decode_embedding``)
+        dim: Expected length, as in ``decode_embedding``
+
+    Returns:
+        A list of float32 arrays (or None) aligned with ``values``
+    """
+    decoded = [None] * len(values)
+    text_rows, text_parts, lengths = [], [], []
+    for i, value in enumerate(values):
+        if isinstance(value, str) and not is_packed(value):
+            body = _text_body(value)
+            if body is None:
+                continue
+            text_rows.append(i)
+            text_parts.append(body)
+            lengths.append(body.count(",") + 1)
+        else:
+            decoded[i] = decode_embedding(value, dim)
+
+    if text_parts:
+        try:
+            flat = np.fromstring(",".join(text_parts), dtype=np.float32, sep=",")
+        except ValueError:
+            flat = None
+        if flat is not None and flat.size == sum(lengths):
+            for i, vector in zip(text_rows, np.split(flat, np.cumsum(lengths)[:-1])):
+                decoded[i] = _checked(vector, dim)
+        else:
+            # A malformed row desynchronizes the bulk parse; fall back to per-row decoding
+            for i, body in zip(text_rows, text_parts):
+                decoded[i] = decode_embedding(body, dim)
+    return decoded
+
+
+def to_pgvector_text(embedding) -> str:
+    """Format an embedding as a pgvector literal (shorter on the wire than a JSON float list)."""
+    return "[" + ",".join(f"{float(value):.7g}" for value in embedding) + "]"
+
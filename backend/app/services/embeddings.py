@@ -1,20 +1,39 @@
-from openai import AzureOpenAI, NotFoundError
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from openai import NotFoundError
 from app.core.config import (
-    AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_EMBEDDING_API_VERSION,
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+    EMBED_BATCH_MAX_INPUTS,
+    EMBED_BATCH_MAX_TOKENS,
+    EMBED_MAX_CONCURRENT_REQUESTS,
+    EMBED_RENORMALIZE_CHUNKS,
 )
+from app.services.embedding_cache import get_cached_embedding, cache_embedding
+from app.services.azure_clients import get_client, api_versions_to_try, remember_api_version, forget_api_version
+from app.services.rate_limiter import call_with_limits
 
 MAX_EMBED_CHARS_PER_CHUNK = 12000
+# Rough characters-per-token ratio used to keep batches under the token limit
+CHARS_PER_TOKEN = 4
 
+_request_pool = None
+_request_pool_lock = threading.Lock()
 
-def _get_client(api_version: str) -> AzureOpenAI:
-    return AzureOpenAI(
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_version=api_version,
-    )
+
+def _get_request_pool() -> ThreadPoolExecutor:
+    # Shared by all callers so EMBED_MAX_CONCURRENT_REQUESTS bounds requests in flight process-wide
+    global _request_pool
+    with _request_pool_lock:
+        if _request_pool is None:
+            _request_pool = ThreadPoolExecutor(
+                max_workers=max(1, EMBED_MAX_CONCURRENT_REQUESTS),
+                thread_name_prefix="embed",
+            )
+        return _request_pool
 
 
 def _candidate_api_versions() -> list[str]:
@@ -57,18 +76,29 @@ def _split_text_for_embedding(text: str, max_chars: int = MAX_EMBED_CHARS_PER_CH
     return chunks or [text[:max_chars]]
 
 
-def _embed_single_text(text: str, deployment: str) -> list[float]:
+def _embed_batch(inputs: list[str], deployment: str) -> list[list[float]]:
+    """Embed several inputs in one request; results are returned in input order.
+
+    The request is paced by the deployment's rate limits and retried on 429s,
+    timeouts and 5xx responses.
+    """
+    budget = sum(_estimate_tokens(text) for text in inputs)
     last_error = None
 
-    for api_version in _candidate_api_versions():
+    for api_version in api_versions_to_try("embeddings", _candidate_api_versions()):
         try:
-            client = _get_client(api_version)
-            response = client.embeddings.create(
+            client = get_client("embeddings", api_version)
+            response = call_with_limits(deployment, budget, lambda: client.embeddings.create(
                 model=deployment,
-                input=text,
-            )
-            return response.data[0].embedding
+                input=inputs,
+            ))
+            remember_api_version("embeddings", api_version)
+            vectors = [None] * len(inputs)
+            for item in response.data:
+                vectors[item.index] = item.embedding
+            return vectors
         except NotFoundError as e:
+            forget_api_version("embeddings", api_version)
             last_error = e
             continue
         except Exception as e:
@@ -83,37 +113,127 @@ def _embed_single_text(text: str, deployment: str) -> list[float]:
     )
 
 
-def get_embedding(text: str, model: str = None) -> list[float]:
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _pack_batches(chunks: list[str]) -> list[list[int]]:
+    """Group chunk indexes into batches within the input-count and token limits."""
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for index, chunk in enumerate(chunks):
+        tokens = _estimate_tokens(chunk)
+        if current and (len(current) >= EMBED_BATCH_MAX_INPUTS or current_tokens + tokens > EMBED_BATCH_MAX_TOKENS):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _merge_chunk_vectors(vectors: list[list[float]], chunks: list[str]) -> list[float]:
+    """Length-weighted average of the chunk embeddings of one text.
+
+    With EMBED_RENORMALIZE_CHUNKS the average is scaled back to unit length.
     """
-    Generate embeddings using Azure OpenAI.
+    if len(vectors) == 1:
+        return vectors[0]
+
+    matrix = np.asarray(vectors, dtype=np.float64)
+    weights = np.fromiter((max(len(chunk), 1) for chunk in chunks), dtype=np.float64, count=len(chunks))
+    merged = weights @ matrix / weights.sum()
+
+    if EMBED_RENORMALIZE_CHUNKS:
+        norm = np.linalg.norm(merged)
+        if norm > 0:
+            merged /= norm
+
+    return merged.tolist()
+
+
+def _embed_chunks(chunks: list[str], deployment: str) -> list[list[float]]:
+    """Embed all chunks, running batched requests concurrently (bounded) when there are several.
+
+    Every batch, a lone one included, goes through the shared request pool so
+    EMBED_MAX_CONCURRENT_REQUESTS holds across concurrent callers.
+    """
+    batches = _pack_batches(chunks)
+    chunk_vectors = [None] * len(chunks)
+
+    futures = [
+        _get_request_pool().submit(_embed_batch, [chunks[index] for index in batch], deployment)
+        for batch in batches
+    ]
+    results = [future.result() for future in futures]
+
+    for batch, vectors in zip(batches, results):
+        for index, vector in zip(batch, vectors):
+            chunk_vectors[index] = vector
+    return chunk_vectors
+
+
+def get_embeddings(texts: list[str], model: str = None) -> list[list[float]]:
+    """
+    Generate embeddings for many texts with as few requests as possible.
+
+    Texts already in the embedding cache are served from it. For the rest,
+    long texts are split into chunks; all chunks are packed into
+    batched requests (bounded by EMBED_BATCH_MAX_INPUTS inputs and an
+    estimated EMBED_BATCH_MAX_TOKENS tokens). Batches run concurrently, with
+    at most EMBED_MAX_CONCURRENT_REQUESTS in flight, and chunk vectors are
+    merged back per text with a NumPy weighted average.
 
     Args:
-        text: Text to embed
+        texts: Texts to embed
         model: Optional deployment override. Defaults to AZURE_OPENAI_EMBEDDING_DEPLOYMENT.
 
     Returns:
-        List of floats representing the embedding vector.
+        One embedding vector per input text, in input order.
     """
     deployment = model or AZURE_OPENAI_EMBEDDING_DEPLOYMENT
-    chunks = _split_text_for_embedding(text)
 
-    if len(chunks) == 1:
-        return _embed_single_text(chunks[0], deployment)
+    results = [get_cached_embedding(deployment, text) for text in texts]
+    missing = [index for index, vector in enumerate(results) if vector is None]
+    if not missing:
+        return results
+
+    chunks = []
+    owners = []
+    for text_index in missing:
+        for chunk in _split_text_for_embedding(texts[text_index]):
+            chunks.append(chunk)
+            owners.append(text_index)
 
-    weighted_vectors = []
-    weights = []
+    chunk_vectors = _embed_chunks(chunks, deployment)
 
-    for chunk in chunks:
-        vector = _embed_single_text(chunk, deployment)
-        weighted_vectors.append(vector)
-        weights.append(max(len(chunk), 1))
+    per_text_vectors = {text_index: [] for text_index in missing}
+    per_text_chunks = {text_index: [] for text_index in missing}
+    for index, owner in enumerate(owners):
+        per_text_vectors[owner].append(chunk_vectors[index])
+        per_text_chunks[owner].append(chunks[index])
 
-    total_weight = float(sum(weights))
-    vector_dim = len(weighted_vectors[0])
-    merged = [0.0] * vector_dim
+    for text_index in missing:
+        vector = _merge_chunk_vectors(per_text_vectors[text_index], per_text_chunks[text_index])
+        cache_embedding(deployment, texts[text_index], vector)
+        results[text_index] = vector
+    return results
 
-    for vector, weight in zip(weighted_vectors, weights):
-        for index in range(vector_dim):
-            merged[index] += float(vector[index]) * (weight / total_weight)
 
-    return merged
+def get_embedding(text: str, model: str = None) -> list[float]:
+    """
+    Generate embeddings using Azure OpenAI.
+
+    Args:
+        text: Text to embed
+        model: Optional deployment override. Defaults to AZURE_OPENAI_EMBEDDING_DEPLOYMENT.
+
+    Returns:
+        List of floats representing the embedding vector.
+    """
+    return get_embeddings([text], model=model)[0]
@@ -0,0 +1,269 @@
+"""Staged ingestion pipeline for uploaded papers.
+
+Stages: receive -> extract -> parse -> embed -> store -> review.
+
+The upload route only performs the ``receive`` stage (persisting the PDF to
+disk) and enqueues an ``ingest_paper`` job; every later stage runs in a job
+worker via ``run_ingestion``. The current stage is persisted on the job row so
+the status endpoints can report it from any process.
+"""
+import asyncio
+
+from app.services.job_queue import get_job_queue, report_progress
+from app.services.content_cache import get_artifacts, store_artifacts, store_review_result
+from app.services.pdf_loader import iter_pages
+from app.services.text_cleaner import iter_clean_lines
+from app.services.section_parser import ParsedPaper, SectionStream
+from app.services.embeddings import get_embeddings
+from app.services.vector_store import (
+    store_paper,
+    store_section,
+    delete_paper_sections,
+    store_review,
+    create_review,
+    store_review_log,
+    finalize_review,
+    delete_review,
+    REVIEW_LOG_NODES,
+)
+from app.services.near_duplicate import get_near_duplicate_index
+from app.services.async_runtime import run_async
+from app.core.config import EMBED_STREAM_FLUSH_SECTIONS, REVIEW_MODE
+from app.graph.graph import build_graph
+from app.graph.nodes.novelty_node import build_novelty_query
+
+# Stage name -> progress percentage reported while the stage is running.
+# Extraction, parsing and embedding overlap: "embedding" starts with the first section.
+STAGE_PROGRESS = {
+    "received": 5,
+    "extracting": 15,
+    "embedding": 35,
+    "storing": 55,
+    "reviewing": 70,
+    "complete": 100,
+    "failed": 100,
+}
+
+
+def set_stage(job_id: str, stage: str) -> None:
+    """Record the current stage of an ingestion job.
+
+    Raises ``LeaseLostError`` once another worker has taken the job over, so
+    this attempt stops before writing anything further.
+    """
+    report_progress(job_id, stage, STAGE_PROGRESS.get(stage, 0))
+
+
+def get_ingestion_status(paper_id: str) -> dict:
+    """Return the stage of the latest ingestion job for a paper, or None if unknown."""
+    job = get_job_queue().get_by_paper(paper_id)
+    if not job:
+        return None
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+    }
+
+
+async def _stream_graph(compiled_graph, initial_state: dict, review_id: str) -> tuple[dict, set]:
+    """Run the graph, logging each review node's output to the review as soon as it finishes.
+
+    Returns the final state and the review_logs node names already written.
+    """
+    result = dict(initial_state)
+    logged = set()
+    async for update in compiled_graph.astream(initial_state, stream_mode="updates"):
+        for node, output in update.items():
+            if not output:
+                continue
+            result.update(output)
+            if not review_id:
+                continue
+            for key, value in output.items():
+                log_node = REVIEW_LOG_NODES.get(key)
+                # The critic's decision is written together with the verdict in finalize_review
+                if log_node is None or key == "final_decision" or value is None:
+                    continue
+                try:
+                    await asyncio.to_thread(store_review_log, review_id, log_node, value)
+                    logged.add(log_node)
+                    print(f"[GRAPH_WORKER] Stored {log_node} output")
+                except Exception as e:
+                    print(f"[GRAPH_WORKER] Failed to store {log_node} output early: {e}")
+    return result, logged
+
+
+def run_graph_sync(
+    paper_id: str,
+    paper: ParsedPaper,
+    review_mode: str = None,
+    content_hash: str = None,
+    use_cache: bool = True,
+) -> dict:
+    """Run the review graph and store its results.
+
+    The graph runs on the shared async runtime, so LLM calls from every
+    concurrent review share one connection pool and concurrency limit.
+    ``review_mode`` selects the graph (see ``build_graph``); None uses REVIEW_MODE.
+    ``content_hash`` keeps earlier copies of the same PDF out of the overlap check;
+    ``use_cache=False`` makes every review node call the model.
+
+    A pending review record is created first; node outputs (and streamed
+    scores, see ``app.services.review_progress``) are logged to it as they
+    arrive and the verdict is written when the critic finishes.
+    """
+    review_mode = review_mode or REVIEW_MODE
+    print(f"[GRAPH_WORKER] Starting {review_mode} review for paper_id: {paper_id}")
+    compiled_graph = build_graph(review_mode)
+
+    try:
+        review_id = create_review(paper_id)
+    except Exception as e:
+        # Without a record up front the review is still stored at the end
+        print(f"[GRAPH_WORKER] Could not create pending review: {e}")
+        review_id = None
+
+    initial_state = {
+        "paper_id": paper_id,
+        "paper_sections": paper,
+        "review_mode": review_mode,
+        "review_id": review_id,
+        "content_hash": content_hash,
+        "use_cache": use_cache,
+        "methodology_review": None,
+        "novelty_review": None,
+        "citation_review": None,
+        "clarity_review": None,
+        "final_decision": None,
+        "critic": {"status": "review", "retry_count": 0}
+    }
+
+    # Execute the graph
+    print("[GRAPH_WORKER] Invoking graph...")
+    try:
+        result, logged = run_async(_stream_graph(compiled_graph, initial_state, review_id))
+    except Exception:
+        # Don't leave a half-logged pending review behind for the job's retry
+        if review_id:
+            try:
+                delete_review(review_id)
+            except Exception as e:
+                print(f"[GRAPH_WORKER] Could not delete pending review {review_id}: {e}")
+        raise
+    print(f"[GRAPH_WORKER] Graph completed. Result keys: {result.keys()}")
+
+    # Store the review results (the paper itself is already stored section by section)
+    review = {key: value for key, value in result.items() if key != "paper_sections"}
+    print("[GRAPH_WORKER] Storing review results...")
+    if review_id:
+        finalize_review(review_id, review, logged)
+    else:
+        store_review(paper_id, review)
+    print("[GRAPH_WORKER] Review stored successfully")
+    return review
+
+
+def _extract_and_embed(job_id: str, file_path: str) -> tuple[ParsedPaper, dict]:
+    # Pages stream through cleaning and heading detection as they are extracted.
+    # Finished sections are embedded in batches of EMBED_STREAM_FLUSH_SECTIONS
+    # while later pages are still being parsed; the remainder is flushed at the end.
+    set_stage(job_id, "extracting")
+    embeddings = {}
+    pending = []
+
+    def flush(extra_texts: tuple = ()):
+        vectors = get_embeddings([content for _, content in pending] + list(extra_texts))
+        for (name, _), vector in zip(pending, vectors):
+            embeddings[name] = vector
+        pending.clear()
+
+    pages = (page["text"] for page in iter_pages(file_path))
+    stream = SectionStream(iter_clean_lines(pages))
+    for name, content in stream:
+        pending.append((name, content))
+        if len(pending) >= EMBED_STREAM_FLUSH_SECTIONS:
+            set_stage(job_id, "embedding")
+            flush()
+
+    # The novelty query rides along in the final batch to warm the embedding
+    # cache, so the review's novelty node doesn't pay for its own round trip
+    set_stage(job_id, "embedding")
+    novelty_query = build_novelty_query(stream.paper)
+    extra_texts = (novelty_query,) if novelty_query else ()
+    if pending or extra_texts:
+        flush(extra_texts)
+    return stream.paper, embeddings
+
+
+def run_ingestion(
+    job_id: str,
+    paper_id: str,
+    title: str,
+    file_path: str,
+    content_hash: str = None,
+    review_mode: str = None,
+    use_cache: bool = True,
+) -> None:
+    """Run every post-upload stage for a paper that is already on disk.
+
+    Exceptions propagate to the job worker, which retries the job until it
+    runs out of attempts. Storage is idempotent per paper_id so retries do
+    not duplicate rows.
+
+    Args:
+        job_id: Queue job driving this ingestion
+        paper_id: Identifier returned to the client by the upload route
+        title: Original filename of the uploaded PDF
+        file_path: Location of the persisted PDF
+        content_hash: SHA-256 of the PDF; reuses cached extraction artifacts
+            and caches the new ones and the finished review
+        review_mode: "fanout" or "combined"; None uses REVIEW_MODE
+        use_cache: False to bypass the LLM response cache (forced re-reviews)
+    """
+    print(f"[INGEST] Starting ingestion for paper_id: {paper_id}")
+
+    artifacts = get_artifacts(content_hash) if content_hash else None
+    if artifacts:
+        print(f"[INGEST] Reusing cached extraction for content hash {content_hash[:12]}")
+        paper, embeddings = artifacts["paper"], artifacts["embeddings"]
+    else:
+        paper, embeddings = _extract_and_embed(job_id, file_path)
+        if content_hash:
+            store_artifacts(content_hash, paper, embeddings)
+
+    set_stage(job_id, "storing")
+    store_paper(title, file_path, paper_id=paper_id)
+    delete_paper_sections(paper_id)
+    for name, content in paper.items():
+        store_section(paper_id, name, content, embeddings[name])
+    try:
+        passages = get_near_duplicate_index().add_paper(paper_id, paper, content_hash)
+        print(f"[INGEST] Indexed {passages} passages for near-duplicate detection")
+    except Exception as e:
+        # The overlap signal is advisory; a broken local index must not fail the ingestion
+        print(f"[INGEST] Near-duplicate indexing failed: {e}")
+
+    set_stage(job_id, "reviewing")
+    review = run_graph_sync(paper_id, paper, review_mode, content_hash, use_cache)
+    if content_hash:
+        store_review_result(content_hash, review)
+
+    print(f"[INGEST] Ingestion complete for paper_id: {paper_id}")
+
+
+def run_ingestion_job(job: dict) -> None:
+    """Job queue handler for ``ingest_paper`` jobs."""
+    payload = job["payload"]
+    run_ingestion(
+        job["id"],
+        payload["paper_id"],
+        payload["title"],
+        payload["file_path"],
+        content_hash=payload.get("content_hash"),
+        review_mode=payload.get("review_mode"),
+        use_cache=payload.get("use_cache", True),
+    )
@@ -0,0 +1,361 @@
+"""Durable SQLite-backed job queue with a configurable worker pool.
+
+Jobs survive restarts: a job is only removed from the runnable set once a
+worker marks it completed or it exhausts its attempts. A claimed job holds a
+lease (visibility timeout) that the worker extends with heartbeats; if the
+worker dies, the lease expires and another worker picks the job up again.
+A worker whose heartbeat finds the lease taken over stops the job at its next
+progress report (``report_progress`` raises ``LeaseLostError``).
+"""
+import importlib
+import json
+import multiprocessing
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+
+from app.core.config import (
+    JOB_QUEUE_PATH,
+    JOB_WORKERS,
+    JOB_WORKER_MODE,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_QUEUE_MAX_PENDING,
+    JOB_POLL_INTERVAL_SECONDS,
+)
+
+# Job kind -> "module:function". Resolved lazily so process workers can import them.
+JOB_HANDLERS = {
+    "ingest_paper": "app.services.ingestion:run_ingestion_job",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    paper_id TEXT,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_paper ON jobs (paper_id);
+"""
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the backlog of unfinished jobs reaches JOB_QUEUE_MAX_PENDING."""
+
+
+class LeaseLostError(RuntimeError):
+    """Raised inside a job whose lease expired and was claimed by another worker."""
+
+
+class JobQueue:
+    """Persistent priority queue stored in a single SQLite file."""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        priority: int = 0,
+        job_id: str = None,
+        paper_id: str = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> str:
+        """Add a job to the queue. Higher priority jobs are claimed first."""
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if JOB_QUEUE_MAX_PENDING and pending >= JOB_QUEUE_MAX_PENDING:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"Job queue is full ({pending} unfinished jobs)")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, paper_id, payload, priority, status, stage, progress, "
+                "attempts, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', 'received', 0, 0, ?, ?, ?)",
+                (job_id, kind, paper_id, json.dumps(payload), priority, max_attempts, now, now),
+            )
+            conn.execute("COMMIT")
+        return job_id
+
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS) -> dict:
+        """Lease the next runnable job, or return None if nothing is runnable.
+
+        Runnable jobs are queued jobs and running jobs whose lease has expired.
+        Expired jobs that already used all their attempts are marked failed.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', updated_at = ?, "
+                "error = COALESCE(error, 'Lease expired after final attempt') "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_expires_at < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + visibility_timeout, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+
+        job = _row_to_job(row)
+        job["attempts"] += 1
+        job["worker_id"] = worker_id
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS) -> bool:
+        """Extend the lease of a job held by worker_id. Returns False if worker_id no longer holds it."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (now + visibility_timeout, now, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def update_progress(self, job_id: str, stage: str, progress: int, worker_id: str = None) -> bool:
+        """Record a job's stage. With worker_id, only while that worker holds the job; returns whether it did."""
+        query = "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?"
+        params = [stage, progress, time.time(), job_id]
+        if worker_id is not None:
+            query += " AND worker_id = ?"
+            params.append(worker_id)
+        with closing(self._connect()) as conn:
+            return conn.execute(query, params).rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', stage = 'complete', progress = 100, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND worker_id = ?",
+                (time.time(), job_id, worker_id),
+            )
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> None:
+        """Record a failed attempt; requeue unless attempts are exhausted."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                "stage = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'received' END, "
+                "progress = CASE WHEN attempts >= max_attempts THEN 100 ELSE 0 END, "
+                "lease_expires_at = NULL, error = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ?",
+                (error, time.time(), job_id, worker_id),
+            )
+
+    def get(self, job_id: str) -> dict:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def get_by_paper(self, paper_id: str) -> dict:
+        """Return the most recent job for a paper."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE paper_id = ? ORDER BY created_at DESC LIMIT 1",
+                (paper_id,),
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide queue instance."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(JOB_QUEUE_PATH)
+        return _queue
+
+
+# job_id -> lease held by a worker in this process: {"queue", "worker_id", "lost": Event}
+_leases = {}
+_leases_lock = threading.Lock()
+
+
+def report_progress(job_id: str, stage: str, progress: int) -> None:
+    """Record a job's stage from inside its handler.
+
+    When the job is run by a worker in this process, the update only applies
+    while that worker still holds the lease; otherwise ``LeaseLostError`` is
+    raised so the handler stops instead of racing the worker that took over.
+    """
+    with _leases_lock:
+        lease = _leases.get(job_id)
+    if lease is None:
+        get_job_queue().update_progress(job_id, stage, progress)
+        return
+    if lease["lost"].is_set() or not lease["queue"].update_progress(job_id, stage, progress, lease["worker_id"]):
+        lease["lost"].set()
+        raise LeaseLostError(f"Job {job_id} is no longer leased to {lease['worker_id']}")
+
+
+def _resolve_handler(kind: str):
+    target = JOB_HANDLERS.get(kind)
+    if not target:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _run_job(queue: JobQueue, job: dict, worker_id: str, visibility_timeout: float) -> None:
+    done = threading.Event()
+    lease = {"queue": queue, "worker_id": worker_id, "lost": threading.Event()}
+    with _leases_lock:
+        _leases[job["id"]] = lease
+
+    def _heartbeat():
+        while not done.wait(max(visibility_timeout / 3, 1.0)):
+            if not queue.heartbeat(job["id"], worker_id, visibility_timeout):
+                lease["lost"].set()
+                print(f"[JOBS] {worker_id} lost the lease on job {job['id']}; stopping at its next stage")
+                return
+
+    heartbeat_thread = threading.Thread(target=_heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        print(f"[JOBS] {worker_id} running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+        _resolve_handler(job["kind"])(job)
+        queue.complete(job["id"], worker_id)
+        print(f"[JOBS] {worker_id} completed job {job['id']}")
+    except LeaseLostError as e:
+        # Another worker owns the job now; its attempt decides the outcome
+        print(f"[JOBS] {worker_id} abandoned job {job['id']}: {e}")
+    except Exception as e:
+        print(f"[JOBS] {worker_id} job {job['id']} failed: {e}")
+        import traceback
+        traceback.print_exc()
+        queue.fail(job["id"], worker_id, str(e))
+    finally:
+        done.set()
+        heartbeat_thread.join(timeout=1.0)
+        with _leases_lock:
+            _leases.pop(job["id"], None)
+
+
+def _worker_loop(queue_path: str, worker_id: str, stop_event, poll_interval: float, visibility_timeout: float) -> None:
+    queue = JobQueue(queue_path)
+    while not stop_event.is_set():
+        try:
+            job = queue.claim(worker_id, visibility_timeout)
+        except sqlite3.OperationalError as e:
+            print(f"[JOBS] {worker_id} could not claim job: {e}")
+            job = None
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+        _run_job(queue, job, worker_id, visibility_timeout)
+
+
+class JobWorkerPool:
+    """Pool of thread or process workers draining the job queue."""
+
+    def __init__(
+        self,
+        queue_path: str = JOB_QUEUE_PATH,
+        workers: int = JOB_WORKERS,
+        mode: str = JOB_WORKER_MODE,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unsupported JOB_WORKER_MODE '{mode}' (expected 'thread' or 'process')")
+        self.queue_path = queue_path
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self._workers = []
+        self._stop_event = None
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        # Make sure the schema exists before workers race to create it
+        JobQueue(self.queue_path)
+
+        if self.mode == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self._stop_event = ctx.Event()
+            factory = ctx.Process
+        else:
+            self._stop_event = threading.Event()
+            factory = threading.Thread
+
+        for index in range(self.workers):
+            worker_id = f"{self.mode}-{index}-{uuid.uuid4().hex[:8]}"
+            worker = factory(
+                target=_worker_loop,
+                args=(self.queue_path, worker_id, self._stop_event, self.poll_interval, self.visibility_timeout),
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+        print(f"[JOBS] Started {self.workers} {self.mode} worker(s) on {self.queue_path}")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Signal workers to stop after their current job and wait for them."""
+        if not self._workers:
+            return
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+        print("[JOBS] Worker pool stopped")
@@ -0,0 +1,77 @@
+"""JSON schemas for review responses and a minimal validator.
+
+The schemas are sent to the provider as structured-output formats where the
+deployment supports them, and are checked locally either way. Only the
+keywords used here are validated: type, properties, required, items,
+minimum and maximum.
+"""
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "number", "minimum": 0, "maximum": 10},
+        "issues": {"type": "array", "items": {"type": "string"}},
+        "suggestions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["score", "issues", "suggestions"],
+    "additionalProperties": False,
+}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+
+def object_schema(properties: dict) -> dict:
+    """Strict object schema with every property required."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def validate(data, schema: dict, path: str = "$") -> list[str]:
+    """Return a list of human-readable violations of ``schema`` (empty when valid)."""
+    expected = schema.get("type")
+    if expected:
+        python_type = _TYPES[expected]
+        # bool is an int subclass but never a valid number here
+        if not isinstance(data, python_type) or (isinstance(data, bool) and expected != "boolean"):
+            return [f"{path}: expected {expected}, got {type(data).__name__}"]
+
+    errors = []
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing required property '{key}'")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], subschema, f"{path}.{key}"))
+    elif expected == "array" and "items" in schema:
+        for index, item in enumerate(data):
+            errors.extend(validate(item, schema["items"], f"{path}[{index}]"))
+    elif expected in ("number", "integer"):
+        if "minimum" in schema and data < schema["minimum"]:
+            errors.append(f"{path}: {data} is below the minimum {schema['minimum']}")
+        if "maximum" in schema and data > schema["maximum"]:
+            errors.append(f"{path}: {data} is above the maximum {schema['maximum']}")
+    return errors
+
+
+# Keywords structured-output providers reject in strict mode; still checked locally
+_LOCAL_ONLY_KEYWORDS = ("minimum", "maximum")
+
+
+def provider_schema(schema: dict) -> dict:
+    """Copy of ``schema`` without keywords strict structured outputs do not accept."""
+    if isinstance(schema, dict):
+        return {key: provider_schema(value) for key, value in schema.items() if key not in _LOCAL_ONLY_KEYWORDS}
+    if isinstance(schema, list):
+        return [provider_schema(value) for value in schema]
+    return schema
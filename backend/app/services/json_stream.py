@@ -0,0 +1,118 @@
+"""Incremental and single-pass extraction of JSON objects from model output.
+
+Streamed completions deliver a review's JSON a few characters at a time.
+``JSONFieldStream`` scans each chunk once with ``_JSONScanner`` (string/escape
+state and nesting depth) and decodes every top-level field as soon as its
+value is complete. A review's ``"score"`` (its first field) is therefore available
+long before the issues and suggestions have been generated. Text before the
+opening brace, such as a markdown code fence, is skipped.
+
+``find_json_object`` uses the same scanner to cut the first complete object
+out of a full response that has prose or code fences around it.
+"""
+import json
+
+OPEN, SEPARATOR, CLOSE = "open", "separator", "close"
+
+
+class _JSONScanner:
+    """String/escape/nesting state of a scan for the first top-level JSON object.
+
+    ``scan`` yields ``(index, event)`` for the positions in a chunk where the
+    object opens, a top-level field ends (its comma) and the object closes.
+    State carries over between chunks; text before the opening brace is skipped.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def scan(self, chunk: str):
+        start = 0
+        if self.depth == 0:
+            start = chunk.find("{")
+            if start < 0:
+                return
+            self.depth = 1
+            yield start, OPEN
+            start += 1
+        for index in range(start, len(chunk)):
+            ch = chunk[index]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    yield index, CLOSE
+                    return
+            elif ch == "," and self.depth == 1:
+                yield index, SEPARATOR
+
+
+class JSONFieldStream:
+    """Feed chunks with ``feed``; each call returns the top-level fields completed by it."""
+
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._scanner = _JSONScanner()
+        self._field = []
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        completed = []
+        if self.done or not chunk:
+            return completed
+        # Start of the current field's text within this chunk (None before the object opens)
+        start = 0 if self._scanner.depth else None
+        for index, event in self._scanner.scan(chunk):
+            if event == OPEN:
+                start = index + 1
+                continue
+            self._field.append(chunk[start:index])
+            self._emit(completed)
+            start = index + 1
+            if event == CLOSE:
+                self.done = True
+                return completed
+        if start is not None:
+            self._field.append(chunk[start:])
+        return completed
+
+    def _emit(self, completed: list) -> None:
+        segment = "".join(self._field).strip()
+        self._field = []
+        if not segment:
+            return
+        try:
+            decoded = json.loads("{" + segment + "}")
+        except ValueError:
+            # Not valid JSON (e.g. a trailing comment); the full-text parse still sees it
+            return
+        for key, value in decoded.items():
+            self.fields[key] = value
+            completed.append((key, value))
+
+
+def find_json_object(text: str) -> str:
+    """The first balanced ``{...}`` in ``text`` (braces inside strings ignored), or None.
+
+    One linear pass with no backtracking, unlike ``\\{[\\s\\S]*\\}`` which
+    grabs up to the last brace of the response and rescans on failure.
+    """
+    start = None
+    for index, event in _JSONScanner().scan(text):
+        if event == OPEN:
+            start = index
+        elif event == CLOSE:
+            return text[start:index + 1]
+    return None
@@ -0,0 +1,82 @@
+"""Cache of parsed JSON responses from review-node LLM calls.
+
+Keyed by (deployment, system prompt, prompt hash, temperature, max_tokens,
+response schema name) and
+stored in a two-tier cache: an in-memory LRU in front of a SQLite file under
+CACHE_DIR with TTL and size-based eviction. Only successfully parsed JSON
+that matches the response schema is stored; error/fallback results are never
+cached.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from app.core.config import CACHE_DIR, LLM_CACHE_ENABLED, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES, LLM_CACHE_MEMORY_ITEMS
+from app.services.cache_store import TwoTierCache
+from app.services.json_schema import validate
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> TwoTierCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TwoTierCache(
+                Path(CACHE_DIR) / "llm_responses.sqlite3",
+                max_memory_items=LLM_CACHE_MEMORY_ITEMS,
+                max_disk_bytes=LLM_CACHE_MAX_BYTES,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS,
+            )
+        return _cache
+
+
+def _cache_key(
+    deployment: str, system_prompt: str, prompt: str, temperature: float, max_tokens: int, schema_name: str
+) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps([deployment, system_prompt or "", prompt_hash, temperature, max_tokens, schema_name])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(
+    deployment: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    schema_name: str = "response",
+) -> dict:
+    """Return the cached parsed response, or None."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    return _get_cache().get_json(_cache_key(deployment, system_prompt, prompt, temperature, max_tokens, schema_name))
+
+
+def cache_response(
+    deployment: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    response: dict,
+    schema: dict = None,
+    schema_name: str = "response",
+) -> None:
+    """Store a parsed response unless it is an error/fallback result or violates ``schema``."""
+    if not LLM_CACHE_ENABLED or not isinstance(response, dict) or response.get("fallback") or "error" in response:
+        return
+    if schema is not None and validate(response, schema):
+        return
+    _get_cache().set_json(
+        _cache_key(deployment, system_prompt, prompt, temperature, max_tokens, schema_name), response
+    )
+
+
+def llm_cache_stats() -> dict:
+    """Hit/miss counters and tier sizes."""
+    if not LLM_CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **_get_cache().stats()}
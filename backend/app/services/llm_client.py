@@ -1,21 +1,64 @@
-"""LLM client utility for Azure OpenAI integration."""
+"""LLM client utility for Azure OpenAI integration.
+
+``call_llm``/``get_json_response`` block the calling thread. The async
+variants ``acall_llm``/``aget_json_response`` share keep-alive connections and
+are bounded by a process-wide semaphore (LLM_MAX_CONCURRENT_REQUESTS) plus
+optional per-deployment limits (LLM_DEPLOYMENT_CONCURRENCY). Parsed JSON
+responses are cached (see ``app.services.llm_cache``) unless ``use_cache``
+is False or LLM_CACHE_ENABLED is off.
+
+Both paths draw from the deployment's request/token budget and retry
+429s, timeouts and 5xx responses with backoff (``app.services.rate_limiter``)
+before giving up and returning a failure.
+
+With ``on_text``/``on_field`` the async completion is streamed: text deltas
+are passed on as they arrive and top-level JSON fields (a review's score
+first) are decoded incrementally, so progress can be published before the
+whole response has been generated.
+
+With a ``schema`` the request asks for provider-side structured output
+(``json_schema``, else ``json_object``; a deployment that rejects a format is
+remembered and asked for the next one). Responses are validated against the
+schema and an unparsable or invalid one gets a single repair request before
+the caller falls back to heuristics.
+"""
+import asyncio
 import json
-import re
-from openai import AzureOpenAI, NotFoundError
+import threading
+import weakref
+from openai import BadRequestError, NotFoundError
 from app.core.config import (
-    AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_CHAT_API_VERSION,
     AZURE_OPENAI_CHAT_DEPLOYMENT,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_DEPLOYMENT_CONCURRENCY,
+    LLM_TEMPERATURE,
+)
+from app.services.llm_cache import get_cached_response, cache_response
+from app.services.json_stream import JSONFieldStream, find_json_object
+from app.services.json_schema import validate, provider_schema
+from app.services.rate_limiter import call_with_limits, acall_with_limits, estimate_tokens
+from app.services.azure_clients import (
+    get_client,
+    get_async_client,
+    api_versions_to_try,
+    remember_api_version,
+    forget_api_version,
 )
 
+# asyncio semaphores belong to one event loop; keep a set per loop
+_limiters = weakref.WeakKeyDictionary()
+_limiters_lock = threading.Lock()
 
-def _get_client(api_version: str) -> AzureOpenAI:
-    return AzureOpenAI(
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_version=api_version,
-    )
+# Structured-output formats, most to least strict
+RESPONSE_FORMATS = ("json_schema", "json_object", None)
+# (deployment, api_version) -> index of the strictest format it accepted
+_format_support = {}
+_format_lock = threading.Lock()
+
+# Longest previous response quoted back in a repair request
+REPAIR_MAX_CHARS = 12000
 
 
 def _candidate_api_versions() -> list[str]:
@@ -32,23 +75,134 @@ def _candidate_api_versions() -> list[str]:
 
 
 def extract_json_response(text: str) -> dict:
-    """Extract JSON from LLM response, handling markdown code blocks."""
+    """Extract JSON from LLM response, handling markdown code blocks and surrounding prose."""
     try:
         return json.loads(text)
     except Exception:
-        # Strip markdown code fences
-        cleaned = re.sub(r"^```(json)?|```$", "", text.strip())
-        # Find first {...} block
-        match = re.search(r"\{[\s\S]*\}", cleaned)
-        if match:
+        candidate = find_json_object(text or "")
+        if candidate is not None:
             try:
-                return json.loads(match.group(0))
+                return json.loads(candidate)
             except Exception:
                 pass
         return None
 
 
-def call_llm(prompt: str, system_prompt: str = None, max_tokens: int = 1500) -> dict:
+def _format_levels(deployment: str, api_version: str, schema: dict) -> tuple:
+    if schema is None:
+        return (None,)
+    with _format_lock:
+        first = _format_support.get((deployment, api_version), 0)
+    return RESPONSE_FORMATS[first:]
+
+
+def _downgrade_format(deployment: str, api_version: str, level: str) -> None:
+    with _format_lock:
+        _format_support[(deployment, api_version)] = RESPONSE_FORMATS.index(level) + 1
+    print(f"[LLM] Deployment '{deployment}' ({api_version}) rejected {level} output; using the next format")
+
+
+def _is_format_error(error: BadRequestError) -> bool:
+    message = str(error).lower()
+    return any(word in message for word in ("response_format", "json_schema", "json_object"))
+
+
+def _create_kwargs(level: str, schema: dict, schema_name: str) -> dict:
+    if level == "json_schema":
+        return {"response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "schema": provider_schema(schema), "strict": True},
+        }}
+    if level == "json_object":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def _create(client, deployment: str, api_version: str, schema: dict, schema_name: str, **request):
+    """``chat.completions.create`` with the strictest response format the deployment accepts."""
+    for level in _format_levels(deployment, api_version, schema):
+        try:
+            return client.chat.completions.create(model=deployment, **request, **_create_kwargs(level, schema, schema_name))
+        except BadRequestError as e:
+            if level is None or not _is_format_error(e):
+                raise
+            _downgrade_format(deployment, api_version, level)
+
+
+async def _acreate(client, deployment: str, api_version: str, schema: dict, schema_name: str, **request):
+    """Async ``_create``."""
+    for level in _format_levels(deployment, api_version, schema):
+        try:
+            return await client.chat.completions.create(
+                model=deployment, **request, **_create_kwargs(level, schema, schema_name)
+            )
+        except BadRequestError as e:
+            if level is None or not _is_format_error(e):
+                raise
+            _downgrade_format(deployment, api_version, level)
+
+
+def _build_messages(prompt: str, system_prompt: str = None) -> list[dict]:
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _failure(deployment: str, last_error: Exception) -> dict:
+    tried = ", ".join(_candidate_api_versions())
+    return {
+        "success": False,
+        "error": (
+            f"Azure chat failed for deployment '{deployment}' at endpoint '{AZURE_OPENAI_ENDPOINT}'. "
+            f"Tried API versions: {tried}. Original error: {last_error}"
+        ),
+    }
+
+
+class _ConcurrencySlot:
+    """The global and per-deployment semaphores of one call, taken and given back together."""
+
+    def __init__(self, global_limit: asyncio.Semaphore, deployment_limit: asyncio.Semaphore = None):
+        self.global_limit = global_limit
+        self.deployment_limit = deployment_limit
+
+    async def acquire(self) -> None:
+        await self.global_limit.acquire()
+        if self.deployment_limit is not None:
+            try:
+                await self.deployment_limit.acquire()
+            except BaseException:
+                self.global_limit.release()
+                raise
+
+    def release(self) -> None:
+        if self.deployment_limit is not None:
+            self.deployment_limit.release()
+        self.global_limit.release()
+
+
+def _limiters_for(deployment: str) -> tuple:
+    """(global semaphore, per-deployment semaphore or None) for the running loop."""
+    loop = asyncio.get_running_loop()
+    with _limiters_lock:
+        limiters = _limiters.get(loop)
+        if limiters is None:
+            limiters = _limiters[loop] = {"global": asyncio.Semaphore(max(LLM_MAX_CONCURRENT_REQUESTS, 1))}
+        if deployment not in limiters and deployment in LLM_DEPLOYMENT_CONCURRENCY:
+            limiters[deployment] = asyncio.Semaphore(max(LLM_DEPLOYMENT_CONCURRENCY[deployment], 1))
+        return limiters["global"], limiters.get(deployment)
+
+
+def call_llm(
+    prompt: str,
+    system_prompt: str = None,
+    max_tokens: int = 1500,
+    temperature: float = LLM_TEMPERATURE,
+    schema: dict = None,
+    schema_name: str = "response",
+) -> dict:
     """
     Call Azure OpenAI LLM with given prompt.
     
@@ -56,69 +210,258 @@ def call_llm(prompt: str, system_prompt: str = None, max_tokens: int = 1500) ->
         prompt: User message
         system_prompt: System message (optional)
         max_tokens: Max tokens in response
+        temperature: Sampling temperature
+        schema: JSON schema to request as structured output (optional)
+        schema_name: Name sent with the schema
         
     Returns:
         Dictionary with 'success' (bool) and 'content' (str) or 'error' (str)
     """
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
-
+    messages = _build_messages(prompt, system_prompt)
     deployment = (AZURE_OPENAI_CHAT_DEPLOYMENT or "").strip()
+    budget = estimate_tokens(system_prompt, prompt) + max_tokens
     last_error = None
 
-    for api_version in _candidate_api_versions():
+    for api_version in api_versions_to_try("chat", _candidate_api_versions()):
         try:
-            client = _get_client(api_version)
-            response = client.chat.completions.create(
-                model=deployment,
+            client = get_client("chat", api_version)
+            response = call_with_limits(deployment, budget, lambda: _create(
+                client, deployment, api_version, schema, schema_name,
                 messages=messages,
-                temperature=0.7,
+                temperature=temperature,
                 max_tokens=max_tokens
-            )
+            ))
+            remember_api_version("chat", api_version)
 
             return {
                 "success": True,
                 "content": response.choices[0].message.content
             }
         except NotFoundError as e:
+            forget_api_version("chat", api_version)
             last_error = e
             continue
         except Exception as e:
             last_error = e
             break
 
-    tried = ", ".join(_candidate_api_versions())
+    return _failure(deployment, last_error)
+
+
+async def _read_stream(stream, on_text) -> str:
+    parts = []
+    async for chunk in stream:
+        # Azure sends content-filter results as chunks without choices
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            await on_text(delta)
+    return "".join(parts)
+
+
+async def acall_llm(
+    prompt: str,
+    system_prompt: str = None,
+    max_tokens: int = 1500,
+    temperature: float = LLM_TEMPERATURE,
+    schema: dict = None,
+    schema_name: str = "response",
+    on_text=None,
+) -> dict:
+    """Async ``call_llm``: same arguments and return value, bounded by the concurrency limits.
+
+    A concurrency slot is only held while a request is in flight (including
+    reading its stream); rate-limit waits and retry backoff happen without one.
+
+    When ``on_text`` (an async callable) is given the completion is streamed
+    and each text delta is awaited through it as it arrives.
+    """
+    messages = _build_messages(prompt, system_prompt)
+    deployment = (AZURE_OPENAI_CHAT_DEPLOYMENT or "").strip()
+    slot = _ConcurrencySlot(*_limiters_for(deployment))
+    budget = estimate_tokens(system_prompt, prompt) + max_tokens
+    last_error = None
+
+    for api_version in api_versions_to_try("chat", _candidate_api_versions()):
+        try:
+            client = get_async_client("chat", api_version)
+            response = await acall_with_limits(deployment, budget, lambda: _acreate(
+                client, deployment, api_version, schema, schema_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=on_text is not None,
+            ), slot=slot)
+            try:
+                content = (
+                    await _read_stream(response, on_text) if on_text is not None
+                    else response.choices[0].message.content
+                )
+            finally:
+                slot.release()
+            remember_api_version("chat", api_version)
+
+            return {
+                "success": True,
+                "content": content
+            }
+        except NotFoundError as e:
+            forget_api_version("chat", api_version)
+            last_error = e
+            continue
+        except Exception as e:
+            last_error = e
+            break
+
+    return _failure(deployment, last_error)
+
+
+def _decode(content: str, schema: dict) -> tuple:
+    """(parsed JSON or None, description of what is wrong with it or None)."""
+    data = extract_json_response(content or "")
+    if data is None:
+        return None, "the response did not contain a parsable JSON object"
+    if schema is not None:
+        errors = validate(data, schema)
+        if errors:
+            return data, "; ".join(errors[:5])
+    return data, None
+
+
+def _repair_prompt(content: str, problem: str, schema: dict) -> str:
+    expected = (
+        f" matching this JSON schema:\n{json.dumps(provider_schema(schema))}" if schema is not None else ""
+    )
+    return (
+        f"Your previous response could not be used: {problem}.\n\n"
+        f"Return ONLY the corrected JSON object{expected}\n\n"
+        f"Keep the original assessment; only fix the format.\n\n"
+        f"Previous response:\n{(content or '')[:REPAIR_MAX_CHARS]}"
+    )
+
+
+def _failed_result(result: dict) -> dict:
     return {
-        "success": False,
-        "error": (
-            f"Azure chat failed for deployment '{deployment}' at endpoint '{AZURE_OPENAI_ENDPOINT}'. "
-            f"Tried API versions: {tried}. Original error: {last_error}"
-        ),
+        "error": result["error"],
+        "fallback": True
+    }
+
+
+def _unparsable_result(content: str, problem: str = None) -> dict:
+    return {
+        "error": f"Failed to extract JSON from response: {problem}" if problem else "Failed to extract JSON from response",
+        "raw_response": content,
+        "fallback": True
     }
 
 
-def get_json_response(prompt: str, system_prompt: str = None, max_tokens: int = 1500) -> dict:
+def _pick_repair(data, problem: str, repaired: dict, schema: dict) -> tuple:
+    # Only a repaired response that fully decodes (and validates) replaces the original
+    if not repaired["success"]:
+        return data, problem
+    repaired_data, repaired_problem = _decode(repaired["content"], schema)
+    if repaired_data is not None and repaired_problem is None:
+        return repaired_data, None
+    return data, problem
+
+
+def _parse_with_repair(result: dict, schema: dict, schema_name: str, max_tokens: int) -> dict:
+    if not result["success"]:
+        return _failed_result(result)
+    data, problem = _decode(result["content"], schema)
+    if problem is not None:
+        print(f"[LLM] Unusable response ({problem}); requesting a repair")
+        repaired = call_llm(
+            _repair_prompt(result["content"], problem, schema), None, max_tokens, 0.0, schema, schema_name
+        )
+        data, problem = _pick_repair(data, problem, repaired, schema)
+    return data if problem is None else _unparsable_result(result["content"], problem)
+
+
+async def _aparse_with_repair(result: dict, schema: dict, schema_name: str, max_tokens: int) -> dict:
+    if not result["success"]:
+        return _failed_result(result)
+    data, problem = _decode(result["content"], schema)
+    if problem is not None:
+        print(f"[LLM] Unusable response ({problem}); requesting a repair")
+        repaired = await acall_llm(
+            _repair_prompt(result["content"], problem, schema), None, max_tokens, 0.0, schema, schema_name
+        )
+        data, problem = _pick_repair(data, problem, repaired, schema)
+    return data if problem is None else _unparsable_result(result["content"], problem)
+
+
+def get_json_response(
+    prompt: str,
+    system_prompt: str = None,
+    max_tokens: int = 1500,
+    temperature: float = LLM_TEMPERATURE,
+    use_cache: bool = True,
+    schema: dict = None,
+    schema_name: str = "response",
+) -> dict:
     """
     Call LLM and extract JSON from response.
     
+    Identical requests are answered from the response cache unless use_cache is False.
+    With a ``schema`` the response is requested as structured output and
+    validated; an unparsable or invalid response gets one repair request.
+
     Returns parsed JSON dict on success, or error dict on failure.
     """
-    result = call_llm(prompt, system_prompt, max_tokens)
-    
-    if not result["success"]:
-        return {
-            "error": result["error"],
-            "fallback": True
-        }
-    
-    json_data = extract_json_response(result["content"])
-    if json_data is None:
-        return {
-            "error": "Failed to extract JSON from response",
-            "raw_response": result["content"],
-            "fallback": True
-        }
-    
-    return json_data
+    deployment = (AZURE_OPENAI_CHAT_DEPLOYMENT or "").strip()
+    if use_cache:
+        cached = get_cached_response(deployment, system_prompt, prompt, temperature, max_tokens, schema_name)
+        if cached is not None:
+            return cached
+
+    result = call_llm(prompt, system_prompt, max_tokens, temperature, schema, schema_name)
+    response = _parse_with_repair(result, schema, schema_name, max_tokens)
+    if use_cache:
+        cache_response(deployment, system_prompt, prompt, temperature, max_tokens, response, schema, schema_name)
+    return response
+
+
+async def aget_json_response(
+    prompt: str,
+    system_prompt: str = None,
+    max_tokens: int = 1500,
+    temperature: float = LLM_TEMPERATURE,
+    use_cache: bool = True,
+    schema: dict = None,
+    schema_name: str = "response",
+    on_field=None,
+) -> dict:
+    """Async ``get_json_response``; cache lookups run off the event loop.
+
+    With ``on_field`` (an async callable taking key and value) the response
+    is streamed and every top-level JSON field is passed on as soon as it has
+    been decoded. Cached responses are returned without calling it.
+    """
+    deployment = (AZURE_OPENAI_CHAT_DEPLOYMENT or "").strip()
+    if use_cache:
+        cached = await asyncio.to_thread(
+            get_cached_response, deployment, system_prompt, prompt, temperature, max_tokens, schema_name
+        )
+        if cached is not None:
+            return cached
+
+    on_text = None
+    if on_field is not None:
+        fields = JSONFieldStream()
+
+        async def feed_fields(delta: str) -> None:
+            for key, value in fields.feed(delta):
+                await on_field(key, value)
+
+        on_text = feed_fields
+
+    result = await acall_llm(prompt, system_prompt, max_tokens, temperature, schema, schema_name, on_text=on_text)
+    response = await _aparse_with_repair(result, schema, schema_name, max_tokens)
+    if use_cache:
+        await asyncio.to_thread(
+            cache_response, deployment, system_prompt, prompt, temperature, max_tokens, response, schema, schema_name
+        )
+    return response
@@ -0,0 +1,240 @@
+"""MinHash/LSH near-duplicate detection over stored paper passages.
+
+Each section is split into overlapping passages of NEAR_DUPLICATE_PASSAGE_WORDS
+words; every passage gets a MinHash signature over its word shingles.
+Signatures are banded into a local SQLite LSH table, so finding passages of
+other papers that resemble a passage of the new paper (candidate
+near-duplicates) is a handful of indexed lookups rather than a scan. The new
+paper is probed with denser windows, so a copied span lines up with some
+window regardless of where it starts.
+
+Candidates are scored exactly: the fraction of the stored passage's shingles
+that also occur anywhere in the new paper (containment). An overlap of 0.9
+means 90% of some existing passage reappears verbatim. No embeddings are
+involved.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import (
+    NEAR_DUPLICATE_INDEX_PATH,
+    NEAR_DUPLICATE_SHINGLE_WORDS,
+    NEAR_DUPLICATE_PASSAGE_WORDS,
+    MINHASH_NUM_PERM,
+    MINHASH_BANDS,
+)
+
+# Bibliographies and acknowledgements overlap legitimately between papers
+SKIP_SECTIONS = ("references", "acknowledgements")
+
+# Shorter passages share common phrases too easily to be a plagiarism signal
+MIN_PASSAGE_WORDS = 50
+
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passages (
+    passage_key TEXT PRIMARY KEY,
+    paper_id TEXT NOT NULL,
+    section_name TEXT NOT NULL,
+    shingles BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_passages_paper ON passages (paper_id);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    passage_key TEXT NOT NULL,
+    paper_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_lookup ON lsh_buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_paper ON lsh_buckets (paper_id);
+CREATE TABLE IF NOT EXISTS paper_content (
+    paper_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_paper_content_hash ON paper_content (content_hash);
+"""
+
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, _PRIME, size=MINHASH_NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.integers(0, _PRIME, size=MINHASH_NUM_PERM, dtype=np.int64)
+
+
+def _shingle_hashes(words: list[str]) -> np.ndarray:
+    n = NEAR_DUPLICATE_SHINGLE_WORDS
+    if len(words) < n:
+        return np.zeros(0, dtype=np.int64)
+    shingles = {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in shingles), dtype=np.int64, count=len(shingles))
+
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature (MINHASH_NUM_PERM slots) of a set of shingle hashes, or None if empty."""
+    if hashes.size == 0:
+        return None
+    # (a * x + b) mod p for every permutation and shingle; a, x < 2^31 so this fits in int64
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def _band_buckets(signature: np.ndarray) -> list[int]:
+    rows = MINHASH_NUM_PERM // MINHASH_BANDS
+    buckets = []
+    for band in range(MINHASH_BANDS):
+        digest = hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def iter_passages(sections, step: int):
+    """Yield (section_name, passage_index, shingle_hashes) for every checked section.
+
+    Windows of NEAR_DUPLICATE_PASSAGE_WORDS words start every ``step`` words;
+    the last one is aligned to the end of the section.
+    """
+    size = NEAR_DUPLICATE_PASSAGE_WORDS
+    for name, content in sections.items():
+        if name in SKIP_SECTIONS:
+            continue
+        words = _WORD.findall(content.lower())
+        if len(words) < MIN_PASSAGE_WORDS:
+            continue
+        starts = list(range(0, max(len(words) - size, 0), step)) + [max(len(words) - size, 0)]
+        for index, start in enumerate(starts):
+            yield name, index, _shingle_hashes(words[start:start + size])
+
+
+class NearDuplicateIndex:
+    """Banded MinHash LSH index persisted in SQLite."""
+
+    def __init__(self, path: str = NEAR_DUPLICATE_INDEX_PATH):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add_paper(self, paper_id: str, sections, content_hash: str = None) -> int:
+        """(Re)index every passage of a paper. Returns the number of passages stored.
+
+        ``content_hash`` (the PDF's SHA-256) is recorded so other papers
+        ingested from the same file are recognised as copies, not overlaps.
+        """
+        passages, buckets = [], []
+        for name, index, hashes in iter_passages(sections, step=NEAR_DUPLICATE_PASSAGE_WORDS // 2):
+            signature = minhash_signature(hashes)
+            if signature is None:
+                continue
+            key = f"{paper_id}:{name}:{index}"
+            passages.append((key, paper_id, name, np.sort(hashes).astype(np.int32).tobytes()))
+            buckets.extend((band, bucket, key, paper_id) for band, bucket in enumerate(_band_buckets(signature)))
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM passages WHERE paper_id = ?", (paper_id,))
+            conn.execute("DELETE FROM lsh_buckets WHERE paper_id = ?", (paper_id,))
+            conn.executemany("INSERT INTO passages VALUES (?, ?, ?, ?)", passages)
+            conn.executemany("INSERT INTO lsh_buckets VALUES (?, ?, ?, ?)", buckets)
+            conn.execute("DELETE FROM paper_content WHERE paper_id = ?", (paper_id,))
+            if content_hash:
+                conn.execute("INSERT INTO paper_content VALUES (?, ?)", (paper_id, content_hash))
+            conn.execute("COMMIT")
+        return len(passages)
+
+    def remove_paper(self, paper_id: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM passages WHERE paper_id = ?", (paper_id,))
+            conn.execute("DELETE FROM lsh_buckets WHERE paper_id = ?", (paper_id,))
+            conn.execute("DELETE FROM paper_content WHERE paper_id = ?", (paper_id,))
+            conn.execute("COMMIT")
+
+    def papers_with_content(self, content_hash: str) -> list[str]:
+        """paper_ids indexed from the PDF with this content hash."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT paper_id FROM paper_content WHERE content_hash = ?", (content_hash,)).fetchall()
+        return [paper_id for (paper_id,) in rows]
+
+    def find_overlap(self, paper_id: str, sections, max_matches: int = 5, content_hash: str = None) -> dict:
+        """Find stored passages of other papers that reappear in ``sections``.
+
+        Args:
+            paper_id: Paper being checked; its own passages are never matched
+            sections: Section mapping of the paper being checked
+            max_matches: Number of best matches to report
+            content_hash: SHA-256 of the paper's PDF; passages of papers
+                ingested from the same file are never matched
+
+        Returns:
+            {"overlap": highest containment (0-1), "matches": [{"paper_id",
+            "section_name", "matched_section", "overlap"}]}
+        """
+        probes = [
+            (name, hashes)
+            for name, _, hashes in iter_passages(sections, step=NEAR_DUPLICATE_PASSAGE_WORDS // 4)
+            if hashes.size
+        ]
+        if not probes:
+            return {"overlap": 0.0, "matches": []}
+        paper_shingles = np.unique(np.concatenate([hashes for _, hashes in probes]))
+
+        best = {}
+        with closing(self._connect()) as conn:
+            copies = {paper_id or ""}
+            if content_hash:
+                copies.update(row[0] for row in conn.execute(
+                    "SELECT paper_id FROM paper_content WHERE content_hash = ?", (content_hash,)
+                ))
+            candidates = {}
+            for name, hashes in probes:
+                for band, bucket in enumerate(_band_buckets(minhash_signature(hashes))):
+                    for (key,) in conn.execute(
+                        "SELECT passage_key FROM lsh_buckets WHERE band = ? AND bucket = ? AND paper_id != ?",
+                        (band, bucket, paper_id or ""),
+                    ):
+                        candidates.setdefault(key, name)
+
+            for key, name in candidates.items():
+                row = conn.execute(
+                    "SELECT paper_id, section_name, shingles FROM passages WHERE passage_key = ?", (key,)
+                ).fetchone()
+                if row is None or row[0] in copies:
+                    continue
+                stored = np.frombuffer(row[2], dtype=np.int32)
+                overlap = float(np.isin(stored, paper_shingles, assume_unique=True).mean()) if stored.size else 0.0
+                pair = (row[0], name, row[1])
+                if overlap > best.get(pair, 0.0):
+                    best[pair] = overlap
+
+        matches = sorted(
+            (
+                {"paper_id": other_paper, "section_name": name, "matched_section": other_section, "overlap": round(overlap, 3)}
+                for (other_paper, name, other_section), overlap in best.items()
+            ),
+            key=lambda match: match["overlap"],
+            reverse=True,
+        )[:max_matches]
+        return {"overlap": matches[0]["overlap"] if matches else 0.0, "matches": matches}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(NEAR_DUPLICATE_INDEX_PATH)
+        return _index
@@ -1,12 +1,119 @@
+import threading
+import time
+from typing import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pypdf import PdfReader
+from app.core.config import PDF_PARALLEL_MIN_PAGES, PDF_EXTRACT_WORKERS, PDF_SLOW_PAGE_SECONDS
 
-def load_pdf_text(file_path: str) -> str:
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> list[dict]:
+    """Extract pages [start, end) with per-page timings. Runs inside pool workers."""
+    reader = PdfReader(file_path)
+    return _extract_pages_from_reader(reader, start, end)
+
+
+def _extract_pages_from_reader(reader: PdfReader, start: int, end: int) -> list[dict]:
+    pages = []
+    for index in range(start, end):
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        pages.append({"page": index, "text": text, "seconds": time.perf_counter() - started})
+    return pages
+
+
+def _page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    # Two ranges per worker keeps workers busy when some pages are much slower than others
+    range_count = min(page_count, workers * 2)
+    size, remainder = divmod(page_count, range_count)
+    ranges = []
+    start = 0
+    for index in range(range_count):
+        end = start + size + (1 if index < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _report_timings(file_path: str, pages: list[dict], mode: str, elapsed: float) -> None:
+    print(f"[PDF] Extracted {len(pages)} pages from {file_path} in {elapsed:.2f}s ({mode})")
+    for page in pages:
+        if page["seconds"] >= PDF_SLOW_PAGE_SECONDS:
+            print(f"[PDF] Slow page {page['page'] + 1}: {page['seconds']:.2f}s")
+
+
+def iter_pages(file_path: str, parallel: bool = None) -> Iterator[dict]:
+    """Yield extracted pages in page order as soon as they are available.
+
+    Args:
+        file_path: Path to the PDF
+        parallel: Force parallel (True) or serial (False) extraction. By default
+            documents with at least PDF_PARALLEL_MIN_PAGES pages are split into
+            page ranges across a process pool.
+
+    Yields:
+        {"page", "text", "seconds"} dicts, one per page.
+    """
+    started = time.perf_counter()
     reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+    pages = []
+
+    if parallel is None:
+        parallel = page_count >= PDF_PARALLEL_MIN_PAGES
+    parallel = parallel and PDF_EXTRACT_WORKERS > 1 and page_count > 1
+
+    if parallel:
+        ranges = _page_ranges(page_count, PDF_EXTRACT_WORKERS)
+        try:
+            # Executor.map yields range results in submission order as they finish
+            chunks = _get_pool().map(
+                _extract_page_range,
+                [file_path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+            )
+            for chunk in chunks:
+                pages.extend(chunk)
+                yield from chunk
+            _report_timings(file_path, pages, "parallel", time.perf_counter() - started)
+            return
+        except (BrokenProcessPool, AssertionError, OSError) as e:
+            # e.g. daemonic job workers cannot spawn children; fall back to serial
+            print(f"[PDF] Parallel extraction unavailable ({e}); falling back to serial")
+            _reset_pool()
+
+    for index in range(len(pages), page_count):
+        page = _extract_pages_from_reader(reader, index, index + 1)[0]
+        pages.append(page)
+        yield page
+    _report_timings(file_path, pages, "serial", time.perf_counter() - started)
+
+
+def extract_pages(file_path: str, parallel: bool = None) -> list[dict]:
+    """Extract text page by page, in page order. See ``iter_pages``."""
+    return list(iter_pages(file_path, parallel=parallel))
 
-    pages_text = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            pages_text.append(text)
 
-    return "\n".join(pages_text)
+def load_pdf_text(file_path: str, parallel: bool = None) -> str:
+    pages = extract_pages(file_path, parallel=parallel)
+    return "\n".join(page["text"] for page in pages if page["text"])
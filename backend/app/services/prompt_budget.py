@@ -0,0 +1,168 @@
+"""Token-budgeted prompt payloads for the review nodes.
+
+Each node has an input token budget (PROMPT_TOKEN_BUDGETS). The budget left
+after the node's fixed instructions is shared between the paper sections it
+reads, in proportion to their priority: sections shorter than their share
+are included whole and the leftover goes to the others, so short papers are
+sent in full and long ones are cut evenly. Sections are cut at sentence
+boundaries (word boundaries only when a single sentence is too long).
+
+Tokens are counted with tiktoken (PROMPT_TOKENIZER_ENCODING) when it is
+installed. Otherwise a local estimator of BPE tokenization is used: one
+token per short word, per group of up to three digits and per punctuation
+mark, plus one extra token for every further six letters of a long word.
+These are the units the OpenAI tokenizers split on, so unlike a
+characters/4 rule it does not undercount symbol- and number-heavy text such
+as tables, equations and reference lists; it errs on the high side, which
+keeps prompts within budget.
+"""
+import re
+
+from app.core.config import PROMPT_TOKEN_BUDGETS, PROMPT_TOKENIZER_ENCODING
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[\"'])")
+_WORD = re.compile(r"\S+")
+
+# Letters per extra token beyond the first for long words
+_LETTERS_PER_TOKEN = 6
+TRIM_MARKER = " [...]"
+MISSING_MARKER = "(not found)"
+DEFAULT_TOKEN_BUDGET = 3000
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, or None to use the estimator (loaded once)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+            except Exception as e:
+                # The encoding files are downloaded on first use; offline hosts fall back
+                print(f"[PROMPT] tiktoken encoding {PROMPT_TOKENIZER_ENCODING} unavailable, estimating tokens: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of model tokens in ``text`` (estimated when tiktoken is unavailable)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate of the number of model tokens in ``text``."""
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        tokens += 1 + (len(piece) - 1) // _LETTERS_PER_TOKEN if piece.isalpha() else 1
+    return tokens
+
+
+def _fitting_prefix_end(text: str, spans, limit: int) -> int:
+    """End offset of the last of ``spans`` (start, end) whose running token total fits in ``limit``."""
+    end, used = 0, 0
+    for start, stop in spans:
+        used += count_tokens(text[start:stop])
+        if used > limit:
+            break
+        end = stop
+    return end
+
+
+def _sentence_spans(text: str):
+    start = 0
+    for separator in _SENTENCE_END.finditer(text):
+        yield start, separator.start()
+        start = separator.end()
+    yield start, len(text)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole sentences that fits in ``max_tokens`` (marked when cut).
+
+    The prefix is a slice of ``text``, so paragraph breaks and other
+    separators between the kept sentences are preserved.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens - count_tokens(TRIM_MARKER)
+    if limit <= 0:
+        return ""
+
+    end = _fitting_prefix_end(text, _sentence_spans(text), limit)
+    if not end:
+        # A single over-long "sentence" (tables, equations): fall back to words
+        end = _fitting_prefix_end(text, (match.span() for match in _WORD.finditer(text)), limit)
+    return text[:end] + TRIM_MARKER if end else ""
+
+
+def _allocate(needs: list[int], priorities: list[float], budget: int) -> list[int]:
+    """Split ``budget`` by priority; sections needing less than their share free the rest."""
+    allocation = [0] * len(needs)
+    open_items = [i for i, need in enumerate(needs) if need > 0]
+    remaining = budget
+    while open_items and remaining > 0:
+        total_priority = sum(priorities[i] for i in open_items)
+        shares = {i: remaining * priorities[i] / total_priority for i in open_items}
+        satisfied = [i for i in open_items if needs[i] <= shares[i]]
+        if not satisfied:
+            for i in open_items:
+                allocation[i] = int(shares[i])
+            break
+        for i in satisfied:
+            allocation[i] = needs[i]
+            remaining -= needs[i]
+        open_items = [i for i in open_items if i not in satisfied]
+    return allocation
+
+
+def payload_budget(node: str, *fixed_texts: str) -> int:
+    """Tokens left for paper text in ``node``'s budget after its fixed prompt texts."""
+    budget = PROMPT_TOKEN_BUDGETS.get(node, DEFAULT_TOKEN_BUDGET)
+    return max(budget - sum(count_tokens(text) for text in fixed_texts), 0)
+
+
+def build_payload(parts: list[tuple], budget: int) -> tuple[str, int]:
+    """Assemble labelled sections into a payload of at most ``budget`` tokens.
+
+    Args:
+        parts: (label, text, priority) per section, in output order. Empty
+            sections are shown as MISSING_MARKER so the model knows they are absent.
+        budget: Token budget for the whole payload, labels included
+
+    Returns:
+        (payload, estimated tokens in payload)
+    """
+    headers = [f"{label}:\n" for label, _, _ in parts]
+    texts = [(text or "").strip() for _, text, _ in parts]
+    fixed = sum(count_tokens(header) for header in headers)
+    fixed += sum(count_tokens(MISSING_MARKER) for text in texts if not text)
+
+    needs = [count_tokens(text) for text in texts]
+    allocation = _allocate(needs, [max(priority, 0.01) for _, _, priority in parts], budget - fixed)
+
+    blocks = []
+    for header, text, need, allowed in zip(headers, texts, needs, allocation):
+        if not text:
+            body = MISSING_MARKER
+        elif allowed >= need:
+            body = text
+        else:
+            body = trim_to_tokens(text, allowed) or TRIM_MARKER.strip()
+        blocks.append(header + body)
+    payload = "\n\n".join(blocks)
+    return payload, count_tokens(payload)
@@ -0,0 +1,257 @@
+"""Per-deployment request/token budgets and retry policy for Azure OpenAI calls.
+
+Every chat and embedding call reserves one request and its estimated tokens
+from its deployment's token buckets (AZURE_RATE_LIMITS, "deployment:rpm:tpm").
+Reservations may push a bucket into debt; the caller then waits until the
+debt is repaid, so concurrent threads and coroutines are spaced out at the
+configured rate instead of bursting into 429s. Once a response reports real
+usage, the token reservation is settled against it; a failed request gives
+its reservation back and every retry reserves again.
+
+Retryable failures (429, timeouts, connection errors, 5xx) are retried with
+jittered exponential backoff. A ``Retry-After`` from the provider pauses the
+whole deployment, not just the caller that received it.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from app.core.config import (
+    AZURE_RATE_LIMITS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+)
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+# Rough characters-per-token ratio used to size token reservations
+CHARS_PER_TOKEN = 4
+
+
+class DeploymentLimiter:
+    """Token buckets for requests/minute and tokens/minute (0 = unlimited)."""
+
+    def __init__(self, deployment: str, rpm: int = 0, tpm: int = 0):
+        self.deployment = deployment
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._counters = {"requests": 0, "throttled": 0, "retries": 0, "rate_limited": 0}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60.0)
+
+    def reserve(self, tokens: int) -> float:
+        """Take one request and ``tokens`` from the budget; return seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._counters["requests"] += 1
+            wait = max(self._blocked_until - now, 0.0)
+            if self.rpm:
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests * 60.0 / self.rpm)
+            if self.tpm:
+                # A single request larger than the whole budget waits for one full window at most
+                self._tokens -= min(tokens, self.tpm)
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60.0 / self.tpm)
+            if wait > 0:
+                self._counters["throttled"] += 1
+            return wait
+
+    def settle(self, reserved_tokens: int, actual_tokens: int) -> None:
+        """Correct a token reservation once the real usage is known."""
+        if not self.tpm or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens = min(float(self.tpm), self._tokens + min(reserved_tokens, self.tpm) - actual_tokens)
+
+    def refund(self, reserved_tokens: int) -> None:
+        """Return the token reservation of a request that failed."""
+        if not self.tpm:
+            return
+        with self._lock:
+            self._tokens = min(float(self.tpm), self._tokens + min(reserved_tokens, self.tpm))
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of this deployment for ``seconds`` (from a Retry-After)."""
+        with self._lock:
+            self._counters["rate_limited"] += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self._counters["retries"] += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "deployment": self.deployment,
+                "requests_per_minute": self.rpm or None,
+                "tokens_per_minute": self.tpm or None,
+                "available_requests": round(self._requests, 1) if self.rpm else None,
+                "available_tokens": int(self._tokens) if self.tpm else None,
+                "paused_for_seconds": round(max(self._blocked_until - now, 0.0), 2),
+                **self._counters,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(deployment: str) -> DeploymentLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(deployment)
+        if limiter is None:
+            rpm, tpm = AZURE_RATE_LIMITS.get(deployment, (0, 0))
+            limiter = _limiters[deployment] = DeploymentLimiter(deployment, rpm, tpm)
+        return limiter
+
+
+def rate_limit_status() -> list[dict]:
+    """Current budget and counters of every deployment used so far (and every configured one)."""
+    for deployment in AZURE_RATE_LIMITS:
+        get_limiter(deployment)
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.status() for limiter in limiters]
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count of the given texts, for reservations before the real usage is known."""
+    return sum(len(text or "") for text in texts) // CHARS_PER_TOKEN
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after_seconds(error: Exception) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except ValueError:
+            continue
+    return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Jittered exponential backoff ("equal jitter"): half fixed, half random
+    delay = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _usage_tokens(response) -> int:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _next_delay(limiter: DeploymentLimiter, error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying, or None if the error should propagate."""
+    if attempt >= LLM_MAX_RETRIES or not _is_retryable(error):
+        return None
+    limiter.record_retry()
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        limiter.pause(retry_after)
+        return retry_after
+    return _backoff_seconds(attempt)
+
+
+def call_with_limits(deployment: str, estimated_tokens: int, send):
+    """Run ``send()`` within the deployment's budget, retrying retryable errors.
+
+    Args:
+        deployment: Azure deployment the request goes to
+        estimated_tokens: Prompt plus expected completion tokens
+        send: Zero-argument callable performing the request
+
+    Returns:
+        Whatever ``send`` returns; the last error is raised once retries run out
+    """
+    limiter = get_limiter(deployment)
+    attempt = 0
+    while True:
+        wait = limiter.reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            response = send()
+        except Exception as e:
+            limiter.refund(estimated_tokens)
+            delay = _next_delay(limiter, e, attempt)
+            if delay is None:
+                raise
+            print(f"[RATE_LIMIT] {deployment}: {type(e).__name__}, retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        limiter.settle(estimated_tokens, _usage_tokens(response))
+        return response
+
+
+async def acall_with_limits(deployment: str, estimated_tokens: int, send, slot=None):
+    """Async ``call_with_limits``; ``send`` returns an awaitable.
+
+    ``slot`` (an object with an ``acquire()`` coroutine and ``release()``,
+    such as the caller's concurrency semaphores) is acquired just before each
+    ``send``, so budget waits, Retry-After pauses and backoff sleeps do not
+    hold it. When ``send`` succeeds the slot is still held and the caller
+    releases it once done with the response; on errors it is released here.
+    """
+    limiter = get_limiter(deployment)
+    attempt = 0
+    while True:
+        wait = limiter.reserve(estimated_tokens)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if slot is not None:
+                await slot.acquire()
+            try:
+                response = await send()
+            except BaseException:
+                if slot is not None:
+                    slot.release()
+                raise
+        except Exception as e:
+            limiter.refund(estimated_tokens)
+            delay = _next_delay(limiter, e, attempt)
+            if delay is None:
+                raise
+            print(f"[RATE_LIMIT] {deployment}: {type(e).__name__}, retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled while waiting or sending
+            limiter.refund(estimated_tokens)
+            raise
+        limiter.settle(estimated_tokens, _usage_tokens(response))
+        return response
@@ -1,6 +1,12 @@
 import numpy as np
-import json
+from app.core.config import SIMILARITY_SEARCH_MODE, SIMILARITY_CANDIDATE_PAPERS
 from app.services.vector_store import supabase
+from app.services.similarity_index import get_section_index
+from app.services.embedding_codec import decode_embedding, decode_embeddings, to_pgvector_text
+from app.services.section_parser import HEADER_MAP
+
+# Most sections one paper can have (one per canonical section name), for RPC over-fetching
+_MAX_SECTIONS_PER_PAPER = len(set(HEADER_MAP.values()))
 
 def cosine_similarity(a, b):
     if not a or not b:
@@ -20,15 +26,9 @@ def cosine_similarity(a, b):
     return float(np.dot(a, b) / denom)
 
 def _parse_embedding(embedding):
-    """Parse embedding from database (could be list, string, or JSON)."""
-    if isinstance(embedding, str):
-        try:
-            return json.loads(embedding)
-        except:
-            return []
-    elif isinstance(embedding, list):
-        return embedding
-    return []
+    """Parse embedding from database (list, pgvector/JSON text or packed string)."""
+    vector = decode_embedding(embedding)
+    return [] if vector is None else vector.tolist()
 
 def search_sections(query_embedding: list[float], top_k: int = 5):
     """Fetch all embeddings and compute similarity manually."""
@@ -47,36 +47,212 @@ def search_sections(query_embedding: list[float], top_k: int = 5):
     scored.sort(key=lambda x: x[0], reverse=True)
     return [sec for score, sec in scored[:top_k]]
 
-def search_similar_sections(query_embedding: list[float], top_k: int = 5, exclude_paper_id: str = None):
+def _attach_content(results: list[dict]) -> list[dict]:
+    """Fetch section content for the (few) top-k hits only."""
+    if not results:
+        return results
+    ids = [result["section_id"] for result in results]
+    res = supabase.table("paper_sections").select("id, content").in_("id", ids).execute()
+    contents = {row["id"]: row.get("content", "") for row in res.data or []}
+    for result in results:
+        result["content"] = contents.get(result["section_id"], "")
+    return results
+
+
+def search_similar_sections(
+    query_embedding: list[float],
+    top_k: int = 5,
+    exclude_paper_id: str = None,
+    section_types: list[str] = None,
+    candidate_papers: int = None,
+    exclude_paper_ids: list[str] = None,
+):
     """Search for similar paper sections, returns with similarity scores.
     
+    Uses the in-memory similarity index by default, searching in two stages:
+    candidate papers by centroid similarity, then their sections.
+    SIMILARITY_SEARCH_MODE=rpc runs top-k in Postgres via the
+    match_paper_sections function (falling back to the in-memory index if the
+    call fails); SIMILARITY_SEARCH_MODE=scan selects the full-table
+    client-side scan. The RPC and scan modes apply section filters but are
+    single-stage.
+
     Args:
         query_embedding: The embedding vector to compare against
         top_k: Number of top results to return
         exclude_paper_id: Optional paper_id to exclude from results (e.g., current paper)
+        section_types: Optional section names to restrict the search to
+            (e.g. ["abstract", "methodology"]); None searches every section
+        candidate_papers: Papers kept by the centroid stage; defaults to
+            SIMILARITY_CANDIDATE_PAPERS, 0 scores every section
+        exclude_paper_ids: Further paper_ids to exclude (e.g. earlier
+            ingestions of the same PDF)
+    """
+    if candidate_papers is None:
+        candidate_papers = SIMILARITY_CANDIDATE_PAPERS
+    if SIMILARITY_SEARCH_MODE == "rpc":
+        try:
+            return _rpc_similar_sections(
+                query_embedding, top_k=top_k, exclude_paper_id=exclude_paper_id,
+                section_types=section_types, exclude_paper_ids=exclude_paper_ids,
+            )
+        except Exception as e:
+            print(f"[RETRIEVAL] match_paper_sections RPC failed, using client-side index: {e}")
+    if SIMILARITY_SEARCH_MODE in ("index", "rpc"):
+        results = get_section_index().search(
+            query_embedding,
+            top_k=top_k,
+            exclude_paper_id=_excluded_ids(exclude_paper_id, exclude_paper_ids),
+            section_types=section_types,
+            candidate_papers=candidate_papers,
+        )
+        return _attach_content(results)
+    return _scan_similar_sections(
+        query_embedding, top_k=top_k, exclude_paper_id=exclude_paper_id,
+        section_types=section_types, exclude_paper_ids=exclude_paper_ids,
+    )
+
+
+def search_similar_sections_batch(
+    query_embeddings: list[list[float]],
+    top_k: int = 5,
+    exclude_paper_id: str = None,
+    section_types: list = None,
+    candidate_papers: int = None,
+    exclude_paper_ids: list[str] = None,
+) -> list[list[dict]]:
+    """Search for several queries at once, each with its own section filter.
+
+    With the in-memory index all queries are scored in one matrix-matrix
+    product and section contents are fetched in a single request. The RPC and
+    scan modes run the queries one by one.
+
+    Args:
+        query_embeddings: Query vectors
+        top_k: Number of results per query
+        exclude_paper_id: Optional paper_id to exclude from every result list
+        section_types: One section-name filter (or None) per query
+        candidate_papers: As in ``search_similar_sections``
+        exclude_paper_ids: As in ``search_similar_sections``
+
+    Returns:
+        One result list per query, in the same format as ``search_similar_sections``
+    """
+    if candidate_papers is None:
+        candidate_papers = SIMILARITY_CANDIDATE_PAPERS
+    section_types = section_types or [None] * len(query_embeddings)
+    if SIMILARITY_SEARCH_MODE == "index":
+        results = get_section_index().search_many(
+            query_embeddings,
+            top_k=top_k,
+            exclude_paper_id=_excluded_ids(exclude_paper_id, exclude_paper_ids),
+            section_types=section_types,
+            candidate_papers=candidate_papers,
+        )
+        _attach_content([result for query_results in results for result in query_results])
+        return results
+    return [
+        search_similar_sections(
+            query_embedding,
+            top_k=top_k,
+            exclude_paper_id=exclude_paper_id,
+            section_types=types,
+            candidate_papers=candidate_papers,
+            exclude_paper_ids=exclude_paper_ids,
+        )
+        for query_embedding, types in zip(query_embeddings, section_types)
+    ]
+
+
+def _excluded_ids(exclude_paper_id: str = None, exclude_paper_ids: list[str] = None) -> list[str]:
+    """Every excluded paper_id, normalized."""
+    paper_ids = [exclude_paper_id] + list(exclude_paper_ids or [])
+    return [str(paper_id).strip().lower() for paper_id in paper_ids if paper_id]
+
+
+def _rpc_similar_sections(
+    query_embedding: list[float],
+    top_k: int = 5,
+    exclude_paper_id: str = None,
+    section_types: list[str] = None,
+    exclude_paper_ids: list[str] = None,
+):
+    """Top-k in Postgres: only the best matches travel over the wire.
+
+    The SQL function excludes one paper; sections of ``exclude_paper_ids``
+    are over-fetched and dropped here.
     """
-    query = supabase.table("paper_sections").select("id, paper_id, content, embedding")
+    normalized_exclude = str(exclude_paper_id).strip().lower() if exclude_paper_id else None
+    extra = set(_excluded_ids(None, exclude_paper_ids)) - {normalized_exclude}
+    per_paper = len(section_types) if section_types is not None else _MAX_SECTIONS_PER_PAPER
+    res = supabase.rpc(
+        "match_paper_sections",
+        {
+            "query_embedding": to_pgvector_text(query_embedding),
+            "match_count": top_k + len(extra) * per_paper,
+            "exclude_paper_id": normalized_exclude,
+            "section_names": section_types,
+        },
+    ).execute()
+    rows = [row for row in res.data or [] if str(row.get("paper_id", "")).strip().lower() not in extra][:top_k]
+    return [
+        {
+            "section_id": row["id"],
+            "paper_id": row["paper_id"],
+            "section_name": row.get("section_name"),
+            "similarity": float(row["similarity"]),
+            "content": row.get("content", ""),
+        }
+        for row in rows
+    ]
+
+
+def _scan_similar_sections(
+    query_embedding: list[float],
+    top_k: int = 5,
+    exclude_paper_id: str = None,
+    section_types: list[str] = None,
+    exclude_paper_ids: list[str] = None,
+):
+    """Score every stored section client-side (no index)."""
+    query = supabase.table("paper_sections").select("id, paper_id, section_name, content, embedding")
+    if section_types is not None:
+        query = query.in_("section_name", section_types)
     normalized_exclude = str(exclude_paper_id).strip().lower() if exclude_paper_id else None
     if normalized_exclude:
         query = query.neq("paper_id", normalized_exclude)
+    excluded = set(_excluded_ids(exclude_paper_id, exclude_paper_ids))
 
     res = query.execute()
-    sections = res.data
+    sections = [
+        sec for sec in res.data or []
+        # Skip sections from the excluded papers
+        if str(sec.get("paper_id", "")).strip().lower() not in excluded
+    ]
+    vectors = decode_embeddings([sec.get("embedding") for sec in sections])
+
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query_vector)
+    same_dim = [i for i, vector in enumerate(vectors) if vector is not None and vector.shape[0] == query_vector.shape[0]]
+    similarities = {}
+    if same_dim and query_norm > 0:
+        # One matrix-vector product for every row matching the query dimension
+        matrix = np.stack([vectors[i] for i in same_dim])
+        norms = np.linalg.norm(matrix, axis=1)
+        scores = (matrix @ query_vector) / np.where(norms > 0, norms * query_norm, np.inf)
+        similarities = dict(zip(same_dim, scores.tolist()))
 
     scored = []
-    for sec in sections:
-        # Skip sections from the excluded paper
-        sec_paper_id = str(sec.get("paper_id", "")).strip().lower()
-        if normalized_exclude and sec_paper_id == normalized_exclude:
-            continue
-            
-        embedding = _parse_embedding(sec.get('embedding', []))
-        if not embedding:
+    for i, sec in enumerate(sections):
+        if vectors[i] is None:
             continue
-        similarity = cosine_similarity(query_embedding, embedding)
+        similarity = similarities.get(i)
+        if similarity is None:
+            similarity = cosine_similarity(query_embedding, vectors[i].tolist())
         scored.append({
             "section_id": sec["id"],
             "paper_id": sec["paper_id"],
+            "section_name": sec.get("section_name"),
             "similarity": similarity,
             "content": sec.get("content", "")
         })
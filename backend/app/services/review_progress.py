@@ -0,0 +1,55 @@
+"""Publishing review results while the review graph is still running.
+
+A pending review record is created before the graph starts. Review nodes
+stream their completions, and each score is logged as a ``partial_scores``
+entry as soon as the incremental JSON parser decodes it. Each node's
+complete output is logged when the node finishes, not after the critic.
+The status endpoint reads these entries to report progress.
+"""
+import asyncio
+
+from app.services.vector_store import store_review_log
+
+# State keys of the review nodes, in the order the status endpoint reports them
+REVIEW_KEYS = ("methodology_review", "novelty_review", "citation_review", "clarity_review")
+
+
+def score_publisher(state: dict, node: str):
+    """``on_field`` callback that logs decoded scores for the state's review, or None.
+
+    A top-level ``score`` is published under ``node``; an object field that
+    carries a score (one aspect of the combined review) under its own key.
+    """
+    review_id = state.get("review_id")
+    if not review_id:
+        return None
+
+    async def publish(key: str, value) -> None:
+        if key == "score":
+            name, score = node, value
+        elif isinstance(value, dict) and "score" in value:
+            name, score = key, value["score"]
+        else:
+            return
+        try:
+            score = round(max(0.0, min(10.0, float(score))), 1)
+        except (TypeError, ValueError):
+            return
+        try:
+            await asyncio.to_thread(store_review_log, review_id, "partial_scores", {"node": name, "score": score})
+            print(f"[PROGRESS] {name} score {score} published")
+        except Exception as e:
+            # Progress is best-effort; the final review is stored regardless
+            print(f"[PROGRESS] Failed to publish {name} score: {e}")
+
+    return publish
+
+
+def current_scores(review: dict) -> dict:
+    """Scores known so far: finished nodes' scores over streamed partial ones."""
+    scores = dict(review.get("partial_scores") or {})
+    for key in REVIEW_KEYS:
+        node_review = review.get(key)
+        if isinstance(node_review, dict) and "score" in node_review:
+            scores[key.removesuffix("_review")] = node_review["score"]
+    return scores
@@ -1,4 +1,6 @@
 import re
+from collections.abc import Mapping
+from typing import Iterable, Iterator
 
 # Map many possible headings to canonical section names
 HEADER_MAP = {
@@ -51,93 +53,230 @@ def _normalize_heading(line: str) -> str:
     return normalized
 
 
-def parse_sections(clean_text: str) -> dict:
-    """Parse sections from cleaned text using line-anchored headings.
+def _heading_alternative(header: str) -> str:
+    words = header.replace("&", "and").split()
+    return r"\s+".join("(?:and|&)" if word == "and" else re.escape(word) for word in words)
 
-    Heuristics:
-    - Detect numbered headings (e.g., "1 Introduction", "2.3 Methods")
-    - Map multiple synonyms to canonical names
-    - If there is preface text before the first heading and no explicit abstract,
-      treat that preface (up to 1200 chars) as the abstract.
-    - If nothing is detected, return full_text fallback.
+
+def _build_heading_matcher() -> tuple[re.Pattern, dict]:
+    """Compile one anchored regex that classifies a stripped line in a single pass.
+
+    Equivalent to normalizing the line with ``_normalize_heading`` and then
+    looking for an exact ``HEADER_MAP`` key or the longest key followed by a
+    space. Alternatives are ordered longest first so the first match is the
+    longest key; each gets a named group mapping back to its canonical name.
+    """
+    normalized_map = {}
+    for header, canonical in HEADER_MAP.items():
+        normalized_map.setdefault(header.replace("&", "and"), canonical)
+
+    group_names = {}
+    alternatives = []
+    for index, header in enumerate(sorted(normalized_map, key=len, reverse=True)):
+        group = f"h{index}"
+        group_names[group] = normalized_map[header]
+        alternatives.append(f"(?P<{group}>{_heading_alternative(header)})")
+
+    pattern = re.compile(
+        r"(?:(?:section\s+)?(?:\d+(?:\.\d+)*|[ivxlcdm]+)[\.)]?\s+)?"
+        r"(?:" + "|".join(alternatives) + r")"
+        r"(?:\s*:?\s*$|\s+\S)",
+        re.IGNORECASE,
+    )
+    return pattern, group_names
+
+
+_HEADING_MATCHER, _HEADING_GROUPS = _build_heading_matcher()
+
+
+def _classify_heading(line: str) -> str:
+    """Return the canonical section name if the line is a heading, else None."""
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    # Heading candidates should be reasonably short and line-anchored
+    if len(stripped) > 90:
+        return None
+
+    match = _HEADING_MATCHER.match(stripped)
+    if match:
+        return _HEADING_GROUPS[match.lastgroup]
+    return None
+
+
+class ParsedPaper(Mapping):
+    """Cleaned paper text held once, plus ``(name, start, end)`` section offsets.
+
+    Behaves as a read-only ``{name: content}`` mapping; each section is
+    materialized lazily as a slice of ``text`` when it is accessed, so a
+    paper is not kept in memory once per section.
     """
-    lines = clean_text.splitlines()
-    headings = []
-
-    for idx, line in enumerate(lines):
-        stripped = line.strip()
-        if not stripped:
-            continue
-
-        # Heading candidates should be reasonably short and line-anchored
-        if len(stripped) > 90:
-            continue
-
-        normalized = _normalize_heading(stripped)
-        canonical = HEADER_MAP.get(normalized)
-        if canonical:
-            headings.append((idx, canonical))
-            continue
-
-        # Allow short headings that start with a known header prefix
-        for header in sorted(HEADER_MAP.keys(), key=len, reverse=True):
-            if normalized.startswith(header + " "):
-                headings.append((idx, HEADER_MAP[header]))
-                canonical = HEADER_MAP[header]
-                break
-        if canonical:
-            continue
-
-        match = HEADER_PATTERN.match(stripped)
-        if match:
-            canonical = HEADER_MAP.get(match.group("header").lower())
-            if canonical:
-                headings.append((idx, canonical))
-
-    # Keep only first occurrence for each canonical section
-    seen = set()
-    ordered = []
-    for line_idx, name in sorted(headings, key=lambda item: item[0]):
-        if name in seen:
-            continue
-        seen.add(name)
-        ordered.append((line_idx, name))
-
-    sections = {}
-
-    # Preface before first heading can act as abstract if plausible length
-    if ordered:
-        first_idx = ordered[0][0]
-        preface = "\n".join(lines[:first_idx]).strip()
-        preface_words = len(preface.split())
-        if preface and "abstract" not in seen and 40 <= preface_words <= 350:
-            sections["abstract"] = preface
-
-    if not ordered:
-        return sections if sections else {"full_text": clean_text.strip()}
-
-    for i, (line_idx, name) in enumerate(ordered):
-        start = line_idx + 1  # exclude heading line itself
-        end = ordered[i + 1][0] if i + 1 < len(ordered) else len(lines)
-        content = "\n".join(lines[start:end]).strip()
-        if content:
-            sections[name] = content
-
-    # Minimal fallbacks when parser misses common titles
-    if "introduction" not in sections:
+
+    __slots__ = ("text", "_spans")
+
+    def __init__(self, text: str, spans: Iterable[tuple[str, int, int]]):
+        self.text = text
+        self._spans = {name: (start, end) for name, start, end in spans}
+
+    def __getitem__(self, name: str) -> str:
+        start, end = self._spans[name]
+        return self.text[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __repr__(self) -> str:
+        return f"ParsedPaper({len(self.text)} chars, sections={list(self._spans)})"
+
+    @property
+    def spans(self) -> list[tuple[str, int, int]]:
+        return [(name, start, end) for name, (start, end) in self._spans.items()]
+
+    def to_dict(self) -> dict:
+        return {"text": self.text, "spans": self.spans}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ParsedPaper":
+        return cls(data["text"], [tuple(span) for span in data["spans"]])
+
+
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    """Shrink [start, end) so text[start:end] == text[start:end].strip()."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _fallback_spans(clean_text: str, found) -> list[tuple[str, int, int]]:
+    """Minimal fallbacks when parser misses common titles."""
+    spans = []
+    if "introduction" not in found:
         intro_match = re.search(r"(?is)\bintroduction\b\s*(.+?)(?:\n\s*\d+\.?\s*|\n\s*methods?\b|\n\s*related work\b|\Z)", clean_text)
         if intro_match:
-            sections["introduction"] = intro_match.group(1).strip()
+            spans.append(("introduction", *_strip_span(clean_text, *intro_match.span(1))))
 
-    if "methodology" not in sections:
+    if "methodology" not in found:
         method_match = re.search(
             r"(?is)\b(methodology|methods?|experimental setup|implementation)\b\s*(.+?)"
             r"(?:\n\s*\d+\.?\s*|\n\s*results?\b|\n\s*experiments?\b|\n\s*evaluation\b|\n\s*discussion\b|\n\s*conclusion\b|\Z)",
             clean_text,
         )
         if method_match:
-            sections["methodology"] = method_match.group(2).strip()
+            spans.append(("methodology", *_strip_span(clean_text, *method_match.span(2))))
+    return spans
+
+
+class SectionStream:
+    """Incrementally parse sections from a stream of cleaned lines.
+
+    Iterating yields ``(name, content)`` pairs as soon as each section's end
+    boundary (the next new heading) is seen, so callers can start processing
+    early sections while later pages are still being extracted. The preface
+    abstract and the regex fallbacks depend on the whole document and are
+    yielded when the stream ends. Once exhausted, ``paper`` holds the
+    ``ParsedPaper`` for the lines joined with newlines.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = lines
+        self.paper = None
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        all_lines = []
+        seen = set()
+        spans = []
+        current_name = None
+        current_lines = []
+        current_start = 0
+        preface = None
+        position = 0
+
+        for line in self._lines:
+            all_lines.append(line)
+            position += len(line) + 1
+            canonical = _classify_heading(line)
+
+            # Only the first occurrence of a canonical heading opens a section
+            if not canonical or canonical in seen:
+                current_lines.append(line)
+                continue
+
+            start, end, content = _close_section(current_lines, current_start)
+            if current_name is None:
+                preface = (start, end, content)
+            elif content:
+                spans.append((current_name, start, end))
+                yield current_name, content
+
+            seen.add(canonical)
+            current_name = canonical
+            current_lines = []
+            current_start = position  # exclude heading line itself
+
+        full_text = "\n".join(all_lines)
+
+        if current_name is not None:
+            start, end, content = _close_section(current_lines, current_start)
+            if content:
+                spans.append((current_name, start, end))
+                yield current_name, content
+
+            # Preface before first heading can act as abstract if plausible length
+            deferred = []
+            start, end, content = preface
+            if content and "abstract" not in seen and 40 <= len(content.split()) <= 350:
+                deferred.append(("abstract", start, end))
+            found = {name for name, _, _ in spans + deferred}
+            deferred.extend(_fallback_spans(full_text, found))
+
+            for name, start, end in deferred:
+                spans.append((name, start, end))
+                yield name, full_text[start:end]
+
+        if not spans:
+            spans.append(("full_text", *_strip_span(full_text, 0, len(full_text))))
+            yield "full_text", full_text[spans[0][1]:spans[0][2]]
 
-    return sections if sections else {"full_text": clean_text.strip()}
+        self.paper = ParsedPaper(full_text, spans)
 
 
+def _close_section(lines: list[str], offset: int) -> tuple[int, int, str]:
+    raw = "\n".join(lines)
+    content = raw.strip()
+    start = offset + len(raw) - len(raw.lstrip())
+    return start, start + len(content), content
+
+
+def iter_sections(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Yield ``(name, content)`` pairs from a stream of cleaned lines. See ``SectionStream``."""
+    return iter(SectionStream(lines))
+
+
+def parse_paper(clean_text: str) -> ParsedPaper:
+    """Parse cleaned text into a ``ParsedPaper`` using line-anchored headings.
+
+    Heuristics:
+    - Detect numbered headings (e.g., "1 Introduction", "2.3 Methods")
+    - Map multiple synonyms to canonical names
+    - If there is preface text before the first heading and no explicit abstract,
+      treat that preface (40-350 words) as the abstract.
+    - If nothing is detected, return full_text fallback.
+
+    Line separators are normalized to "\n", matching how sections were
+    previously rebuilt from ``splitlines()``.
+    """
+    stream = SectionStream(clean_text.splitlines())
+    for _ in stream:
+        pass
+    return stream.paper
+
+
+def parse_sections(clean_text: str) -> dict:
+    """Parse sections from cleaned text into a plain ``{name: content}`` dict."""
+    return dict(parse_paper(clean_text))
@@ -0,0 +1,684 @@
+"""Process-local similarity index over stored paper sections.
+
+Section embeddings are held as one pre-normalized float32 matrix plus
+parallel id arrays, so a query is a single matrix-vector product followed by
+an ``argpartition`` top-k. Per-paper centroid vectors allow a two-stage
+search (candidate papers first, then their sections). With SIMILARITY_INDEX_BACKEND=ivf an inverted-file
+(IVF) approximate index restricts each query to the closest clusters. The
+index is loaded from ``paper_sections`` once
+(and again every SIMILARITY_INDEX_REFRESH_SECONDS to pick up rows written by
+other processes) and updated incrementally as sections are stored.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import (
+    SIMILARITY_INDEX_REFRESH_SECONDS,
+    SIMILARITY_INDEX_PAGE_SIZE,
+    SIMILARITY_INDEX_BACKEND,
+    SIMILARITY_INDEX_PATH,
+    IVF_NLIST,
+    IVF_NPROBE,
+    IVF_MIN_TRAIN_SIZE,
+    IVF_TRAIN_SAMPLE,
+    EMBEDDING_STORAGE_FORMAT,
+    PAPER_CENTROID_WEIGHTS,
+)
+from app.services.embedding_codec import decode_embedding, decode_embeddings
+
+# Centroid weight of sections not in PAPER_CENTROID_WEIGHTS: only matters for
+# papers that have none of the weighted sections
+_OTHER_SECTION_WEIGHT = 1e-3
+
+
+def normalize_paper_id(paper_id) -> str:
+    return str(paper_id or "").strip().lower()
+
+
+def _to_vector(embedding) -> np.ndarray:
+    return decode_embedding(embedding)
+
+
+class ExactSectionIndex:
+    """Brute-force cosine index over a dense normalized matrix.
+
+    Alongside the section rows the index keeps one summary vector per paper:
+    the weighted sum of its normalized section vectors, using
+    PAPER_CENTROID_WEIGHTS (other sections get a negligible weight, so papers
+    without an abstract/introduction/methodology still get a centroid). The
+    sums are updated as sections are added and removed, and searches can
+    first pick candidate papers by centroid and then rerank only their
+    sections.
+    """
+
+    def __init__(self, dim: int = None, capacity: int = 1024):
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((capacity, dim or 0), dtype=np.float32)
+        self._paper_codes = np.zeros(capacity, dtype=np.int32)
+        self._section_codes = np.zeros(capacity, dtype=np.int32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._section_ids = []
+        self._paper_ids = []
+        self._codes = {}
+        # paper_id (as first added) by paper code
+        self._code_paper_ids = []
+        # Row numbers of every paper's live sections, by paper code
+        self._paper_rows = []
+        self._section_name_codes = {}
+        self._section_names = []
+        self._paper_sums = np.zeros((0, dim or 0), dtype=np.float32)
+        self._paper_weights = np.zeros(0, dtype=np.float32)
+        self._paper_centroid_cache = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._alive[: self._size].sum())
+
+    def _fit(self, vector: np.ndarray) -> np.ndarray:
+        # Match the index dimension (pad/truncate) so mismatched rows still compare on shared dims
+        if vector.shape[0] == self.dim:
+            return vector
+        fitted = np.zeros(self.dim, dtype=np.float32)
+        shared = min(self.dim, vector.shape[0])
+        fitted[:shared] = vector[:shared]
+        return fitted
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed <= capacity and self._matrix.shape[1] == self.dim:
+            return
+        new_capacity = capacity if needed <= capacity else max(needed, capacity * 2)
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        codes = np.zeros(new_capacity, dtype=np.int32)
+        section_codes = np.zeros(new_capacity, dtype=np.int32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._size:
+            matrix[: self._size] = self._matrix[: self._size]
+            codes[: self._size] = self._paper_codes[: self._size]
+            section_codes[: self._size] = self._section_codes[: self._size]
+            alive[: self._size] = self._alive[: self._size]
+        self._matrix, self._paper_codes, self._section_codes, self._alive = matrix, codes, section_codes, alive
+
+    def _grow_papers(self) -> None:
+        papers = len(self._codes)
+        if self._paper_sums.shape[0] >= papers and self._paper_sums.shape[1] == self.dim:
+            return
+        capacity = max(papers, 2 * self._paper_sums.shape[0], 64)
+        sums = np.zeros((capacity, self.dim), dtype=np.float32)
+        weights = np.zeros(capacity, dtype=np.float32)
+        known = min(self._paper_sums.shape[0], capacity)
+        if known and self._paper_sums.shape[1] == self.dim:
+            sums[:known] = self._paper_sums[:known]
+            weights[:known] = self._paper_weights[:known]
+        self._paper_sums, self._paper_weights = sums, weights
+
+    def _section_weights(self, section_codes: np.ndarray) -> np.ndarray:
+        table = np.array(
+            [PAPER_CENTROID_WEIGHTS.get(name, _OTHER_SECTION_WEIGHT) for name in self._section_names] or [0.0],
+            dtype=np.float32,
+        )
+        return table[section_codes]
+
+    def _section_code(self, name: str) -> int:
+        code = self._section_name_codes.get(name)
+        if code is None:
+            code = self._section_name_codes[name] = len(self._section_names)
+            self._section_names.append(name)
+        return code
+
+    def _accumulate_papers(self, start: int, end: int) -> None:
+        """Add rows [start, end) to their papers' centroid sums."""
+        self._grow_papers()
+        codes = self._paper_codes[start:end]
+        weights = self._section_weights(self._section_codes[start:end])
+        np.add.at(self._paper_sums, codes, self._matrix[start:end] * weights[:, None])
+        np.add.at(self._paper_weights, codes, weights)
+        self._paper_centroid_cache = None
+
+    def _rebuild_papers(self) -> None:
+        self._paper_rows = [[] for _ in self._codes]
+        for row in np.flatnonzero(self._alive[: self._size]).tolist():
+            self._paper_rows[self._paper_codes[row]].append(row)
+        self._paper_sums = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._paper_weights = np.zeros(0, dtype=np.float32)
+        self._grow_papers()
+        live = np.flatnonzero(self._alive[: self._size])
+        codes = self._paper_codes[live]
+        weights = self._section_weights(self._section_codes[live])
+        np.add.at(self._paper_sums, codes, self._matrix[live] * weights[:, None])
+        np.add.at(self._paper_weights, codes, weights)
+        self._paper_centroid_cache = None
+
+    def add(self, section_id: str, paper_id: str, embedding, section_name: str = None) -> None:
+        self.add_many([section_id], [paper_id], [embedding], [section_name])
+
+    def add_many(self, section_ids: list, paper_ids: list, embeddings: list, section_names: list = None) -> None:
+        """Bulk insert; vectors are normalized in one pass."""
+        section_names = section_names or [None] * len(section_ids)
+        rows = []
+        for section_id, paper_id, embedding, section_name in zip(section_ids, paper_ids, embeddings, section_names):
+            vector = _to_vector(embedding)
+            if vector is not None:
+                rows.append((section_id, paper_id, vector, section_name or ""))
+        if not rows:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = rows[0][2].shape[0]
+            block = np.stack([self._fit(vector) for _, _, vector, _ in rows])
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            block /= np.where(norms > 0, norms, 1.0)
+
+            start = self._size
+            self._grow(start + len(rows))
+            end = start + len(rows)
+            self._matrix[start:end] = block
+            codes = []
+            for _, paper_id, _, _ in rows:
+                key = normalize_paper_id(paper_id)
+                code = self._codes.get(key)
+                if code is None:
+                    code = self._codes[key] = len(self._code_paper_ids)
+                    self._code_paper_ids.append(paper_id)
+                codes.append(code)
+            self._paper_codes[start:end] = codes
+            self._paper_rows.extend([] for _ in range(len(self._codes) - len(self._paper_rows)))
+            for row, code in enumerate(self._paper_codes[start:end].tolist(), start):
+                self._paper_rows[code].append(row)
+            self._section_codes[start:end] = [self._section_code(name) for _, _, _, name in rows]
+            self._alive[start:end] = True
+            self._section_ids.extend(section_id for section_id, _, _, _ in rows)
+            self._paper_ids.extend(paper_id for _, paper_id, _, _ in rows)
+            self._size = end
+            self._accumulate_papers(start, end)
+
+    def remove_paper(self, paper_id: str) -> None:
+        with self._lock:
+            code = self._codes.get(normalize_paper_id(paper_id))
+            if code is not None:
+                self._alive[self._paper_rows[code]] = False
+                self._paper_rows[code] = []
+                if code < self._paper_sums.shape[0]:
+                    self._paper_sums[code] = 0.0
+                    self._paper_weights[code] = 0.0
+                    self._paper_centroid_cache = None
+
+    def _paper_centroids(self) -> np.ndarray:
+        if self._paper_centroid_cache is None:
+            papers = len(self._codes)
+            sums = self._paper_sums[:papers]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self._paper_centroid_cache = sums / np.where(norms > 0, norms, 1.0)
+        return self._paper_centroid_cache
+
+    def search_papers(self, query_embedding, top_n: int = 50, exclude_paper_id=None) -> list[dict]:
+        """Return the top_n papers by centroid similarity as {"paper_id", "similarity"}."""
+        query = self._normalized_query(query_embedding)
+        with self._lock:
+            if query is None:
+                return []
+            codes, scores = self._top_papers(query, top_n, exclude_paper_id)
+            return [
+                {"paper_id": self._code_paper_ids[code], "similarity": float(score)}
+                for code, score in zip(codes.tolist(), scores)
+            ]
+
+    def _excluded_codes(self, exclude_paper_id) -> list[int]:
+        """Codes of the excluded paper(s); ``exclude_paper_id`` is one paper_id or a collection of them."""
+        if not exclude_paper_id:
+            return []
+        paper_ids = [exclude_paper_id] if isinstance(exclude_paper_id, str) else exclude_paper_id
+        codes = (self._codes.get(normalize_paper_id(paper_id)) for paper_id in paper_ids)
+        return [code for code in codes if code is not None]
+
+    def _top_papers(self, query: np.ndarray, top_n: int, exclude_paper_id=None):
+        papers = len(self._codes)
+        if papers == 0 or top_n <= 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        scores = self._paper_centroids() @ query
+        eligible = self._paper_weights[:papers] > 0
+        eligible[self._excluded_codes(exclude_paper_id)] = False
+        codes = np.flatnonzero(eligible)
+        if codes.size == 0:
+            return codes, np.zeros(0, dtype=np.float32)
+        k = min(top_n, codes.size)
+        top = np.argpartition(-scores[codes], k - 1)[:k]
+        top = top[np.argsort(-scores[codes][top])]
+        return codes[top], scores[codes][top]
+
+    def _normalized_query(self, query_embedding) -> np.ndarray:
+        query = _to_vector(query_embedding)
+        with self._lock:
+            if query is None or self._size == 0:
+                return None
+            query = self._fit(query)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else None
+
+    def search(
+        self,
+        query_embedding,
+        top_k: int = 5,
+        exclude_paper_id=None,
+        section_types: list = None,
+        candidate_papers: int = 0,
+    ) -> list[dict]:
+        """Return the top_k most similar sections.
+
+        Args:
+            query_embedding: Query vector
+            top_k: Number of sections to return
+            exclude_paper_id: Paper (or collection of papers) whose sections are never returned
+            section_types: Only consider sections with these names (None = all)
+            candidate_papers: If > 0, first pick this many papers by centroid
+                similarity and only rerank their sections
+
+        Returns:
+            A list of {"section_id", "paper_id", "section_name", "similarity"}
+        """
+        return self.search_many([query_embedding], top_k, exclude_paper_id, [section_types], candidate_papers)[0]
+
+    def search_many(
+        self,
+        query_embeddings: list,
+        top_k: int = 5,
+        exclude_paper_id=None,
+        section_types: list = None,
+        candidate_papers: int = 0,
+    ) -> list[list[dict]]:
+        """Top-k for several queries with one matrix-matrix product.
+
+        Every query's candidate rows are gathered once (their union) and
+        scored against all queries together; each query then takes its top-k
+        among its own candidates.
+
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of sections to return per query
+            exclude_paper_id: Paper (or collection of papers) whose sections are never returned
+            section_types: One section-name filter (or None) per query
+            candidate_papers: As in ``search``, applied per query
+
+        Returns:
+            One result list per query, in the same format as ``search``
+        """
+        queries = [self._normalized_query(query) for query in query_embeddings]
+        section_types = section_types or [None] * len(queries)
+        results = [[] for _ in queries]
+        with self._lock:
+            live = [i for i, query in enumerate(queries) if query is not None]
+            if not live or top_k <= 0:
+                return results
+
+            valid = self._alive[: self._size].copy()
+            for code in self._excluded_codes(exclude_paper_id):
+                valid[self._paper_rows[code]] = False
+
+            section_masks = {}
+            masks = []
+            for i in live:
+                mask = valid
+                types = section_types[i]
+                if types is not None:
+                    key = tuple(types)
+                    if key not in section_masks:
+                        allowed = [self._section_name_codes[name] for name in types if name in self._section_name_codes]
+                        section_masks[key] = np.isin(self._section_codes[: self._size], allowed)
+                    mask = mask & section_masks[key]
+                if candidate_papers > 0:
+                    # Stage 1: candidate papers by centroid; stage 2 scores only their sections
+                    codes, _ = self._top_papers(queries[i], candidate_papers, exclude_paper_id)
+                    mask = mask & self._rows_mask([self._paper_rows[code] for code in codes.tolist()])
+                probe_mask = self._candidate_mask(queries[i])
+                if probe_mask is not None:
+                    # Approximate backends only score rows in the probed clusters, with or without stage 1
+                    mask = mask & probe_mask
+                masks.append(mask)
+
+            block = np.stack([queries[i] for i in live], axis=1)
+            union = np.logical_or.reduce(masks)
+            rows = np.flatnonzero(union)
+            if rows.size == 0:
+                return results
+            if rows.size > self._size // 2:
+                scores = (self._matrix[: self._size] @ block)[rows]
+            else:
+                # Only gather and score the candidate rows
+                scores = self._matrix[rows] @ block
+
+            for column, (i, mask) in enumerate(zip(live, masks)):
+                selected = mask[rows]
+                candidates = rows[selected]
+                if candidates.size == 0:
+                    continue
+                candidate_scores = scores[selected, column]
+                k = min(top_k, candidates.size)
+                top = np.argpartition(-candidate_scores, k - 1)[:k]
+                top = top[np.argsort(-candidate_scores[top])]
+                results[i] = [
+                    {
+                        "section_id": self._section_ids[candidates[j]],
+                        "paper_id": self._paper_ids[candidates[j]],
+                        "section_name": self._section_names[self._section_codes[candidates[j]]] or None,
+                        "similarity": float(candidate_scores[j]),
+                    }
+                    for j in top
+                ]
+            return results
+
+    def _rows_mask(self, row_lists: list) -> np.ndarray:
+        """Boolean mask over the index rows that is set only at the given row numbers."""
+        mask = np.zeros(self._size, dtype=bool)
+        if row_lists:
+            mask[np.concatenate([np.asarray(rows, dtype=np.int64) for rows in row_lists])] = True
+        return mask
+
+    def _candidate_mask(self, query: np.ndarray):
+        """Boolean mask of rows worth scoring, or None to score every row."""
+        return None
+
+
+class IVFSectionIndex(ExactSectionIndex):
+    """Inverted-file approximate index (pure NumPy).
+
+    Rows are assigned to the nearest of ``nlist`` spherical k-means centroids;
+    a query only scores rows in its ``nprobe`` closest clusters. Until
+    ``min_train_size`` rows exist the index behaves exactly like
+    ``ExactSectionIndex``. Supports incremental inserts, deletes by paper_id,
+    exclude-self filtering and save/load to an ``.npz`` snapshot.
+    """
+
+    def __init__(
+        self,
+        dim: int = None,
+        capacity: int = 1024,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        min_train_size: int = IVF_MIN_TRAIN_SIZE,
+    ):
+        super().__init__(dim=dim, capacity=capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._centroids = None
+        self._assignments = np.full(capacity, -1, dtype=np.int32)
+        # Row numbers of the live rows in each inverted list, so a query gathers only its probed lists
+        self._list_rows = []
+        self._trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _grow(self, needed: int) -> None:
+        super()._grow(needed)
+        if self._assignments.shape[0] < self._matrix.shape[0]:
+            assignments = np.full(self._matrix.shape[0], -1, dtype=np.int32)
+            assignments[: self._size] = self._assignments[: self._size]
+            self._assignments = assignments
+
+    def add_many(self, section_ids: list, paper_ids: list, embeddings: list, section_names: list = None) -> None:
+        with self._lock:
+            before = self._size
+            super().add_many(section_ids, paper_ids, embeddings, section_names)
+            if self._size == before:
+                return
+            if self.trained:
+                labels = self._assign(self._matrix[before:self._size])
+                self._assignments[before:self._size] = labels
+                for label in np.unique(labels).tolist():
+                    added = before + np.flatnonzero(labels == label)
+                    self._list_rows[label] = np.concatenate([self._list_rows[label], added])
+            # Retrain once the index has grown well past the data the centroids were fit on
+            if self._size >= self.min_train_size and self._size >= 4 * max(self._trained_size, 1):
+                self.train()
+
+    def train(self, iterations: int = 10, sample_size: int = IVF_TRAIN_SAMPLE, seed: int = 0) -> None:
+        """Fit centroids with spherical k-means on a sample and reassign every row."""
+        with self._lock:
+            live = np.flatnonzero(self._alive[: self._size])
+            if live.size == 0:
+                return
+            rng = np.random.default_rng(seed)
+            sample = live if live.size <= sample_size else rng.choice(live, sample_size, replace=False)
+            data = self._matrix[sample]
+            nlist = max(1, min(self.nlist, int(np.sqrt(live.size)) or 1, data.shape[0]))
+
+            centroids = data[rng.choice(data.shape[0], nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, data)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                # Re-seed empty clusters with random points
+                sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()))]
+                norms[empty] = 1.0
+                centroids = sums / norms
+
+            self._centroids = centroids.astype(np.float32)
+            self._assignments[: self._size] = self._assign(self._matrix[: self._size])
+            self._rebuild_lists()
+            self._trained_size = self._size
+            print(f"[INDEX] Trained IVF index: {nlist} lists over {live.size} rows")
+
+    def _rebuild_lists(self) -> None:
+        live = np.flatnonzero(self._alive[: self._size])
+        order = np.argsort(self._assignments[live], kind="stable")
+        bounds = np.searchsorted(self._assignments[live][order], np.arange(self._centroids.shape[0] + 1))
+        self._list_rows = [live[order[bounds[i]:bounds[i + 1]]] for i in range(self._centroids.shape[0])]
+
+    def remove_paper(self, paper_id: str) -> None:
+        with self._lock:
+            code = self._codes.get(normalize_paper_id(paper_id))
+            rows = np.asarray(self._paper_rows[code] if code is not None else [], dtype=np.int64)
+            super().remove_paper(paper_id)
+            if self.trained and rows.size:
+                for label in np.unique(self._assignments[rows]).tolist():
+                    self._list_rows[label] = self._list_rows[label][~np.isin(self._list_rows[label], rows)]
+
+    def _assign(self, rows: np.ndarray, batch: int = 8192) -> np.ndarray:
+        labels = np.empty(rows.shape[0], dtype=np.int32)
+        for start in range(0, rows.shape[0], batch):
+            labels[start:start + batch] = np.argmax(rows[start:start + batch] @ self._centroids.T, axis=1)
+        return labels
+
+    def _candidate_mask(self, query: np.ndarray):
+        if not self.trained:
+            return None
+        nprobe = min(self.nprobe, self._centroids.shape[0])
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        return self._rows_mask([self._list_rows[probe] for probe in probes.tolist()])
+
+    def save(self, path: str) -> None:
+        with self._lock, open(path, "wb") as f:
+            size = self._size
+            np.savez(
+                f,
+                matrix=self._matrix[:size],
+                paper_codes=self._paper_codes[:size],
+                section_codes=self._section_codes[:size],
+                section_names=np.array(self._section_names, dtype=str),
+                alive=self._alive[:size],
+                assignments=self._assignments[:size],
+                centroids=self._centroids if self.trained else np.zeros((0, self.dim or 0), dtype=np.float32),
+                section_ids=np.array(self._section_ids, dtype=str),
+                paper_ids=np.array([str(pid) for pid in self._paper_ids], dtype=str),
+                code_keys=np.array(sorted(self._codes, key=self._codes.get), dtype=str),
+                params=np.array([self.nlist, self.nprobe, self.min_train_size, self._trained_size]),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFSectionIndex":
+        data = np.load(path, allow_pickle=False)
+        nlist, nprobe, min_train_size, trained_size = (int(value) for value in data["params"])
+        matrix = data["matrix"]
+        index = cls(dim=matrix.shape[1], capacity=max(matrix.shape[0], 1024), nlist=nlist, nprobe=nprobe, min_train_size=min_train_size)
+        size = matrix.shape[0]
+        index._grow(size)
+        index._matrix[:size] = matrix
+        index._paper_codes[:size] = data["paper_codes"]
+        index._section_codes[:size] = data["section_codes"]
+        index._section_names = data["section_names"].tolist()
+        index._section_name_codes = {name: code for code, name in enumerate(index._section_names)}
+        index._alive[:size] = data["alive"]
+        index._assignments[:size] = data["assignments"]
+        index._section_ids = data["section_ids"].tolist()
+        index._paper_ids = data["paper_ids"].tolist()
+        index._codes = {key: code for code, key in enumerate(data["code_keys"].tolist())}
+        # Every code was created with its paper's first row
+        _, first_rows = np.unique(index._paper_codes[:size], return_index=True)
+        index._code_paper_ids = [index._paper_ids[row] for row in first_rows.tolist()]
+        index._size = size
+        if data["centroids"].shape[0]:
+            index._centroids = data["centroids"]
+            index._trained_size = trained_size
+        index._rebuild_papers()
+        if index.trained:
+            index._rebuild_lists()
+        return index
+
+
+_index = None
+_loaded_at = 0.0
+_index_lock = threading.Lock()
+# Held by the one thread (re)loading the index; searches keep using the current index meanwhile
+_rebuild_lock = threading.Lock()
+# Section adds/removals made while a reload runs, replayed onto the new index before it is swapped in
+_pending_changes = None
+
+
+def _common_dim_only(vectors: list) -> list:
+    """Drop vectors whose length differs from the most common one in the batch."""
+    lengths = [vector.shape[0] for vector in vectors if vector is not None]
+    if not lengths:
+        return vectors
+    dim = max(set(lengths), key=lengths.count)
+    return [vector if vector is not None and vector.shape[0] == dim else None for vector in vectors]
+
+
+def _load_index() -> ExactSectionIndex:
+    if SIMILARITY_INDEX_BACKEND == "ivf" and SIMILARITY_INDEX_PATH and os.path.exists(SIMILARITY_INDEX_PATH):
+        if time.time() - os.path.getmtime(SIMILARITY_INDEX_PATH) < SIMILARITY_INDEX_REFRESH_SECONDS:
+            try:
+                index = IVFSectionIndex.load(SIMILARITY_INDEX_PATH)
+                print(f"[INDEX] Loaded {len(index)} section embeddings from {SIMILARITY_INDEX_PATH}")
+                return index
+            except KeyError as e:
+                print(f"[INDEX] Snapshot {SIMILARITY_INDEX_PATH} is missing {e}, rebuilding from the database")
+
+    from app.services.vector_store import supabase
+
+    index = IVFSectionIndex() if SIMILARITY_INDEX_BACKEND == "ivf" else ExactSectionIndex()
+    # The packed column decodes without text parsing; rows written before it existed fall back to pgvector text
+    columns = "id, paper_id, section_name, embedding" + (", embedding_packed" if EMBEDDING_STORAGE_FORMAT else "")
+    start = 0
+    rejected = 0
+    while True:
+        res = (
+            supabase.table("paper_sections")
+            .select(columns)
+            .order("id")
+            .range(start, start + SIMILARITY_INDEX_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = res.data or []
+        # Rows must match the index dimension; the first page's most common length sets it
+        vectors = decode_embeddings([row.get("embedding_packed") or row.get("embedding") for row in rows], dim=index.dim)
+        if index.dim is None:
+            vectors = _common_dim_only(vectors)
+        rejected += sum(vector is None for vector in vectors)
+        index.add_many(
+            [row["id"] for row in rows],
+            [row.get("paper_id") for row in rows],
+            vectors,
+            [row.get("section_name") for row in rows],
+        )
+        if len(rows) < SIMILARITY_INDEX_PAGE_SIZE:
+            break
+        start += SIMILARITY_INDEX_PAGE_SIZE
+    print(f"[INDEX] Loaded {len(index)} section embeddings ({SIMILARITY_INDEX_BACKEND})")
+    if rejected:
+        print(f"[INDEX] Skipped {rejected} sections with missing or malformed embeddings")
+
+    if isinstance(index, IVFSectionIndex):
+        if len(index) >= index.min_train_size:
+            index.train()
+        if SIMILARITY_INDEX_PATH:
+            index.save(SIMILARITY_INDEX_PATH)
+    return index
+
+
+def _replay_changes(index: ExactSectionIndex, changes: list) -> None:
+    """Apply changes recorded during a reload that the loaded rows may not reflect."""
+    loaded = set(index._section_ids)
+    removed = set()
+    for change in changes:
+        if change[0] == "remove":
+            index.remove_paper(change[1])
+            removed.add(normalize_paper_id(change[1]))
+            continue
+        _, section_id, paper_id, embedding, section_name = change
+        # Already loaded from the database, unless a later removal of its paper dropped it again
+        if section_id in loaded and normalize_paper_id(paper_id) not in removed:
+            continue
+        index.add(section_id, paper_id, embedding, section_name)
+
+
+def get_section_index() -> ExactSectionIndex:
+    """Return the process-wide index, loading or refreshing it when stale.
+
+    The reload runs without holding ``_index_lock``: other threads keep
+    searching (and updating) the current index until the new one is swapped in.
+    Only the very first load makes callers wait.
+    """
+    global _index, _loaded_at, _pending_changes
+    with _index_lock:
+        current = _index
+        if current is not None and time.time() - _loaded_at <= SIMILARITY_INDEX_REFRESH_SECONDS:
+            return current
+
+    if not _rebuild_lock.acquire(blocking=current is None):
+        return current
+    try:
+        with _index_lock:
+            if _index is not None and time.time() - _loaded_at <= SIMILARITY_INDEX_REFRESH_SECONDS:
+                return _index
+            _pending_changes = []
+        try:
+            index = _load_index()
+        except Exception:
+            with _index_lock:
+                _pending_changes = None
+            raise
+        with _index_lock:
+            _replay_changes(index, _pending_changes)
+            _pending_changes = None
+            _index, _loaded_at = index, time.time()
+            return _index
+    finally:
+        _rebuild_lock.release()
+
+
+def index_section(section_id: str, paper_id: str, embedding, section_name: str = None) -> None:
+    """Add a newly stored section (and update its paper's centroid) if the index is loaded in this process."""
+    with _index_lock:
+        index = _index
+        if _pending_changes is not None:
+            _pending_changes.append(("add", section_id, paper_id, embedding, section_name))
+    if index is not None:
+        index.add(section_id, paper_id, embedding, section_name)
+
+
+def remove_paper_from_index(paper_id: str) -> None:
+    with _index_lock:
+        index = _index
+        if _pending_changes is not None:
+            _pending_changes.append(("remove", paper_id))
+    if index is not None:
+        index.remove_paper(paper_id)
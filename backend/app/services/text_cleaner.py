@@ -1,4 +1,9 @@
 import re
+from typing import Iterable, Iterator
+
+_INLINE_WHITESPACE = re.compile(r"[ \t]+")
+_PAGE_NUMBER_LINE = re.compile(r"\d+")
+
 
 def clean_text(raw_text: str) -> str:
     text = raw_text
@@ -7,4 +12,46 @@ def clean_text(raw_text: str) -> str:
     text = re.sub(r"[ \t]+", " ", text)
     text = re.sub(r"\n\s+\n", "\n\n", text)
     text = re.sub(r"\n\d+\n", "\n", text)
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+
+def iter_clean_lines(pages: Iterable[str]) -> Iterator[str]:
+    """Clean page texts line by line as they stream in.
+
+    Line-level equivalent of ``clean_text`` applied to the pages joined with
+    newlines: runs of spaces/tabs collapse to one space, whitespace-only lines
+    become blank, consecutive blank lines collapse to one, bare page-number
+    lines are dropped (unless last) and leading/trailing blank lines are
+    trimmed. Unlike the regex pass, runs of consecutive number lines are all
+    dropped. Only one page is held in memory at a time.
+    """
+    started = False
+    pending_blank = False
+    # A bare number is only a page number if another line follows it
+    pending_number = None
+
+    for page in pages:
+        if not page:
+            continue
+        for line in page.split("\n"):
+            line = _INLINE_WHITESPACE.sub(" ", line)
+            is_number = started and _PAGE_NUMBER_LINE.fullmatch(line)
+            pending_number = None
+            if not line.strip():
+                pending_blank = started
+                continue
+            if is_number:
+                pending_number = line
+                continue
+            if pending_blank:
+                yield ""
+                pending_blank = False
+            if not started:
+                line = line.lstrip()
+                started = True
+            yield line
+
+    if pending_number is not None:
+        if pending_blank:
+            yield ""
+        yield pending_number
@@ -1,19 +1,34 @@
 from supabase import create_client, Client
 import uuid
 import re
-from app.core.config import SUPABASE_URL, SUPABASE_KEY
+from app.core.config import SUPABASE_URL, SUPABASE_KEY, EMBEDDING_STORAGE_FORMAT
+from app.services.similarity_index import index_section, remove_paper_from_index
+from app.services.embedding_codec import encode_embedding, to_pgvector_text
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def store_paper(title: str, file_path: str) -> str:
-    paper_id = str(uuid.uuid4())
-    supabase.table("papers").insert({   
+def store_paper(title: str, file_path: str, paper_id: str = None) -> str:
+    paper_id = paper_id or str(uuid.uuid4())
+    # Upsert so a retried ingestion job can store the same paper again
+    supabase.table("papers").upsert({
         "id": paper_id,
         "title": title,
         "file_path": file_path
     }).execute()
     return paper_id
 
+def delete_paper_sections(paper_id: str) -> None:
+    """Remove all stored sections of a paper (used before re-storing them)."""
+    supabase.table("paper_sections").delete().eq("paper_id", paper_id).execute()
+    remove_paper_from_index(paper_id)
+
+def _section_embedding_fields(embedding: list[float]) -> dict:
+    # pgvector literal instead of a JSON float list; optional packed copy for fast bulk loads
+    fields = {"embedding": to_pgvector_text(embedding)}
+    if EMBEDDING_STORAGE_FORMAT:
+        fields["embedding_packed"] = encode_embedding(embedding, EMBEDDING_STORAGE_FORMAT)
+    return fields
+
 def store_section(paper_id: str, section_name: str, content: str, embedding: list[float]):
     section_id = str(uuid.uuid4())
     payload = {
@@ -21,7 +36,7 @@ def store_section(paper_id: str, section_name: str, content: str, embedding: lis
         "paper_id": paper_id,
         "section_name": section_name,
         "content": content,
-        "embedding": embedding
+        **_section_embedding_fields(embedding),
     }
 
     try:
@@ -33,19 +48,39 @@ def store_section(paper_id: str, section_name: str, content: str, embedding: lis
             raise
 
         expected_dim = int(match.group(1))
-        current_embedding = embedding or []
+        current_embedding = list(embedding or [])
         current_dim = len(current_embedding)
 
         if current_dim < expected_dim:
-            adjusted_embedding = current_embedding + [0.0] * (expected_dim - current_dim)
+            embedding = current_embedding + [0.0] * (expected_dim - current_dim)
         else:
-            adjusted_embedding = current_embedding[:expected_dim]
+            embedding = current_embedding[:expected_dim]
 
-        payload["embedding"] = adjusted_embedding
+        payload.update(_section_embedding_fields(embedding))
         supabase.table("paper_sections").insert(payload).execute()
 
+    index_section(section_id, paper_id, embedding, section_name)
     return section_id
 
+def _latest_review(rows: list[dict]) -> dict:
+    """The most recently started of a paper's reviews, whatever its verdict.
+
+    Review rows carry no timestamp; ``create_review`` logs a REVIEW_STARTED_LOG
+    entry whose timestamp orders them. Reviews written before that entry
+    existed are ordered by their latest log entry.
+    """
+    if len(rows) == 1:
+        return rows[0]
+    by_id = {row.get("id"): row for row in rows}
+    for node_name in (REVIEW_STARTED_LOG, None):
+        query = supabase.table("review_logs").select("review_id, timestamp").in_("review_id", list(by_id))
+        if node_name:
+            query = query.eq("node_name", node_name)
+        newest = query.order("timestamp", desc=True).limit(1).execute()
+        if newest.data and newest.data[0].get("review_id") in by_id:
+            return by_id[newest.data[0]["review_id"]]
+    return rows[-1]
+
 def get_paper_review(paper_id: str) -> dict:
     """
     Retrieve the review for a paper from the database.
@@ -63,7 +98,7 @@ def get_paper_review(paper_id: str) -> dict:
             print(f"[RETRIEVE] No review found for paper {paper_id}")
             return None
 
-        review_row = review_result.data[0]
+        review_row = _latest_review(review_result.data)
         review_id = review_row.get("id")
         print(f"[RETRIEVE] Found review_id: {review_id}")
 
@@ -95,7 +130,10 @@ def get_paper_review(paper_id: str) -> dict:
                         pass
 
                 # Map node names to review fields
-                if "methodology" in node_name and node_output:
+                if node_name == "partial_scores" and isinstance(node_output, dict):
+                    # Scores published while the node's response was still streaming
+                    review.setdefault("partial_scores", {})[node_output.get("node")] = node_output.get("score")
+                elif "methodology" in node_name and node_output:
                     review["methodology_review"] = node_output
                     print(f"[RETRIEVE] Set methodology_review")
                 elif "novelty" in node_name and node_output:
@@ -145,54 +183,99 @@ def get_paper_review(paper_id: str) -> dict:
         return None
 
 
+# System reviewer ID for AI reviews (fixed UUID for all AI reviews)
+SYSTEM_REVIEWER_ID = "00000000-0000-0000-0000-000000000001"
+
+# Review state key -> review_logs.node_name
+REVIEW_LOG_NODES = {
+    "methodology_review": "methodology_node",
+    "novelty_review": "novelty_node",
+    "citation_review": "citation_node",
+    "clarity_review": "clarity_node",
+    "final_decision": "final_decision_node",
+}
+
+# review_logs.node_name of the entry create_review writes; its timestamp is the review's start time
+REVIEW_STARTED_LOG = "review_started"
+
+
+def create_review(paper_id: str) -> str:
+    """Create a pending review record so node outputs can be logged as they finish.
+
+    Pending reviews left for the paper by an earlier, interrupted run are removed first.
+    """
+    stale = supabase.table("reviews").select("id").eq("paper_id", paper_id).eq("verdict", "Pending").execute()
+    for row in stale.data or []:
+        delete_review(row["id"])
+
+    review_id = str(uuid.uuid4())
+    supabase.table("reviews").insert({
+        "id": review_id,
+        "paper_id": paper_id,
+        "reviewer_id": SYSTEM_REVIEWER_ID,
+        "verdict": "Pending",
+        "notes": ""
+    }).execute()
+    store_review_log(review_id, REVIEW_STARTED_LOG, {"paper_id": paper_id})
+    return review_id
+
+
+def store_review_log(review_id: str, node_name: str, node_output) -> None:
+    """Append one node's output (or a partial result) to a review."""
+    import json
+
+    if node_output is None:
+        return
+    supabase.table("review_logs").insert({
+        "id": str(uuid.uuid4()),
+        "review_id": review_id,
+        "node_name": node_name,
+        "node_output": json.dumps(node_output) if not isinstance(node_output, str) else node_output
+    }).execute()
+
+
+def finalize_review(review_id: str, review_data: dict, logged_nodes=()) -> str:
+    """Record the verdict of a review created with ``create_review``.
+
+    Node outputs not already in ``logged_nodes`` are logged, followed by the
+    full final state.
+    """
+    try:
+        print(f"[STORE] review_data: {review_data}")
+        final_decision = review_data.get("final_decision") or {}
+        supabase.table("reviews").update({
+            "verdict": final_decision.get("decision", "Pending"),
+            "notes": final_decision.get("justification", "")
+        }).eq("id", review_id).execute()
+
+        for key, node_name in REVIEW_LOG_NODES.items():
+            if node_name not in logged_nodes:
+                store_review_log(review_id, node_name, review_data.get(key))
+        store_review_log(review_id, "final_state", review_data)
+        return review_id
+    except Exception as e:
+        print(f"Error storing review: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
 def store_review(paper_id: str, review_data: dict) -> str:
     """
     Store review results in reviews and review_logs tables.
     First creates a review record, then stores each node's output as a log entry.
     """
     try:
-        import json
-        
-        # System reviewer ID for AI reviews (fixed UUID for all AI reviews)
-        system_reviewer_id = "00000000-0000-0000-0000-000000000001"
-
-        print(f"[STORE] review_data: {review_data}")
-        
-        # First, create a review record linking paper to review
-        review_id = str(uuid.uuid4())
-        supabase.table("reviews").insert({
-            "id": review_id,
-            "paper_id": paper_id,
-            "reviewer_id": system_reviewer_id,
-            "verdict": review_data.get("final_decision", {}).get("decision", "Pending"),
-            "notes": review_data.get("final_decision", {}).get("justification", "")
-        }).execute()
-        
-        # Store each review component as a log entry linked to this review
-        nodes_to_store = [
-            ("methodology_node", review_data.get("methodology_review")),
-            ("novelty_node", review_data.get("novelty_review")),
-            ("citation_node", review_data.get("citation_review")),
-            ("clarity_node", review_data.get("clarity_review")),
-            ("final_decision_node", review_data.get("final_decision")),
-            ("final_state", review_data),
-        ]
-        
-        for node_name, node_output in nodes_to_store:
-            if node_output is None:
-                continue
-                
-            log_id = str(uuid.uuid4())
-            supabase.table("review_logs").insert({
-                "id": log_id,
-                "review_id": review_id,
-                "node_name": node_name,
-                "node_output": json.dumps(node_output) if not isinstance(node_output, str) else node_output
-            }).execute()
-        
-        return review_id
+        review_id = create_review(paper_id)
     except Exception as e:
         print(f"Error storing review: {e}")
         import traceback
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+    return finalize_review(review_id, review_data)
+
+
+def delete_review(review_id: str) -> None:
+    """Remove a review and its logs (a pending review whose graph run failed)."""
+    supabase.table("review_logs").delete().eq("review_id", review_id).execute()
+    supabase.table("reviews").delete().eq("id", review_id).execute()
@@ -0,0 +1,137 @@
+"""Recall/latency benchmark: IVF approximate index vs. exact cosine search.
+
+Run from backend/:
+    python -m benchmarks.ann_recall_benchmark [--rows 50000] [--dim 256] [--queries 200]
+
+Generates clustered synthetic embeddings (many sections per paper), then for
+each query compares the IVF index's top-k against exact brute-force cosine
+similarity. It reports recall@k and per-query latency for the IVF index, the
+exact NumPy index and the legacy per-row ``cosine_similarity`` scan (timed on
+a subset, since it is orders of magnitude slower). It then deletes a share
+of the papers from both indexes and reports recall, latency and delete time
+again, checking that no deleted paper is returned. It also checks that an
+IVF snapshot round-trips through save/load.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# retrieval builds the Supabase client at import; the benchmark never uses it
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from app.services.retrieval import cosine_similarity
+from app.services.similarity_index import ExactSectionIndex, IVFSectionIndex
+
+
+def build_dataset(rows: int, dim: int, topics: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=rows)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32)
+    paper_ids = [f"paper-{i // 9}" for i in range(rows)]
+    queries = centers[rng.integers(0, topics, size=rows // 100 or 1)] + 0.6 * rng.normal(size=(rows // 100 or 1, dim)).astype(np.float32)
+    return vectors, paper_ids, queries
+
+
+def _recall(approx_results, exact_results) -> float:
+    return float(np.mean([
+        len({r["section_id"] for r in approx} & {r["section_id"] for r in truth}) / max(len(truth), 1)
+        for approx, truth in zip(approx_results, exact_results)
+    ]))
+
+
+def _time_queries(index, queries, top_k):
+    started = time.perf_counter()
+    results = [index.search(q, top_k=top_k, exclude_paper_id="paper-0") for q in queries]
+    return results, (time.perf_counter() - started) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--scan-rows", type=int, default=5000, help="rows used to time the legacy scan")
+    parser.add_argument("--delete-share", type=float, default=0.2, help="share of papers deleted before the second pass")
+    args = parser.parse_args()
+
+    vectors, paper_ids, queries = build_dataset(args.rows, args.dim, args.topics)
+    queries = queries[: args.queries]
+
+    exact = ExactSectionIndex()
+    ivf = IVFSectionIndex(nlist=args.nlist, nprobe=args.nprobe, min_train_size=args.rows + 1)
+    started = time.perf_counter()
+    for i, (vector, paper_id) in enumerate(zip(vectors, paper_ids)):
+        exact.add(f"s{i}", paper_id, vector)
+        ivf.add(f"s{i}", paper_id, vector)
+    build_time = time.perf_counter() - started
+    started = time.perf_counter()
+    ivf.train()
+    train_time = time.perf_counter() - started
+
+    exact_results, exact_latency = _time_queries(exact, queries, args.top_k)
+    ivf_results, ivf_latency = _time_queries(ivf, queries, args.top_k)
+
+    recall = _recall(ivf_results, exact_results)
+
+    # Legacy path: Python loop of cosine_similarity over list embeddings
+    scan_rows = [vector.tolist() for vector in vectors[: args.scan_rows]]
+    scan_queries = [q.tolist() for q in queries[:5]]
+    started = time.perf_counter()
+    for q in scan_queries:
+        sorted((cosine_similarity(q, row) for row in scan_rows), reverse=True)[: args.top_k]
+    scan_latency = (time.perf_counter() - started) / len(scan_queries) * (args.rows / len(scan_rows))
+
+    # Delete every n-th paper from both indexes, then search again
+    papers = sorted(set(paper_ids), key=lambda pid: int(pid.split("-")[1]))
+    step = max(int(round(1 / args.delete_share)), 1) if args.delete_share > 0 else len(papers) + 1
+    deleted = set(papers[1::step])
+    started = time.perf_counter()
+    for paper_id in deleted:
+        exact.remove_paper(paper_id)
+    exact_delete_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for paper_id in deleted:
+        ivf.remove_paper(paper_id)
+    ivf_delete_time = time.perf_counter() - started
+
+    exact_after, exact_latency_after = _time_queries(exact, queries, args.top_k)
+    ivf_after, ivf_latency_after = _time_queries(ivf, queries, args.top_k)
+    recall_after = _recall(ivf_after, exact_after)
+    leaked = sum(r["paper_id"] in deleted for results in exact_after + ivf_after for r in results)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ivf.npz")
+        ivf.save(path)
+        restored = IVFSectionIndex.load(path)
+        round_trip = all(
+            [r["section_id"] for r in restored.search(q, top_k=args.top_k)] == [r["section_id"] for r in ivf.search(q, top_k=args.top_k)]
+            for q in queries[:20]
+        )
+
+    print("=" * 80)
+    print(f"Rows: {args.rows}, dim: {args.dim}, queries: {len(queries)}, top-k: {args.top_k}")
+    print(f"Build: {build_time:.2f}s, IVF train: {train_time:.2f}s (nlist={args.nlist}, nprobe={args.nprobe})")
+    print(f"Legacy cosine scan (extrapolated): {scan_latency * 1000:9.2f} ms/query")
+    print(f"Exact NumPy index:                 {exact_latency * 1000:9.2f} ms/query")
+    print(f"IVF index:                         {ivf_latency * 1000:9.2f} ms/query")
+    print(f"IVF recall@{args.top_k} vs exact: {recall:.3f}")
+    print(f"After deleting {len(deleted)} papers: exact {exact_delete_time * 1000:.1f} ms, IVF {ivf_delete_time * 1000:.1f} ms total")
+    print(f"Exact NumPy index:                 {exact_latency_after * 1000:9.2f} ms/query")
+    print(f"IVF index:                         {ivf_latency_after * 1000:9.2f} ms/query")
+    print(f"IVF recall@{args.top_k} vs exact: {recall_after:.3f}")
+    print(f"Results from deleted papers: {leaked}")
+    print(f"Save/load round trip identical: {round_trip}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: combined single-call review vs. the fan-out review nodes.
+
+Run from backend/ with Azure OpenAI credentials configured:
+    python -m benchmarks.review_mode_benchmark paper1.pdf paper2.pdf ... [--repeat 1]
+
+For every PDF the methodology, citation and clarity reviews are produced
+both ways: the three fan-out nodes concurrently, and ``combined_review_node``
+alone. Novelty is embedding-based and identical in both modes, so it is left
+out. The LLM response cache is disabled so every run reaches the model.
+
+Reports per mode the estimated input tokens per paper and the wall time,
+and per aspect how closely the two modes' scores agree (mean absolute
+difference and share of papers within one point).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# Every run must reach the model
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from app.services.pdf_loader import load_pdf_text
+from app.services.text_cleaner import clean_text
+from app.services.section_parser import parse_paper
+from app.graph.nodes.methodology_node import methodology_node
+from app.graph.nodes.citation_node import citation_node
+from app.graph.nodes.clarity_node import clarity_node
+from app.graph.nodes.combined_node import combined_review_node, ASPECTS
+
+
+async def run_fanout(state: dict) -> dict:
+    reviews = {}
+    for result in await asyncio.gather(methodology_node(state), citation_node(state), clarity_node(state)):
+        reviews.update(result)
+    return reviews
+
+
+async def run_combined(state: dict) -> dict:
+    return await combined_review_node(state)
+
+
+def _input_tokens(reviews: dict) -> int:
+    # Aspects answered by the combined call all report the same shared prompt
+    shared = [reviews[key].get("input_tokens", 0) for key, _ in ASPECTS.values() if reviews[key].get("combined")]
+    separate = [reviews[key].get("input_tokens", 0) for key, _ in ASPECTS.values() if not reviews[key].get("combined")]
+    return max(shared, default=0) + sum(separate)
+
+
+async def benchmark(papers: dict, repeat: int) -> dict:
+    results = {"fanout": [], "combined": []}
+    for name, paper in papers.items():
+        state = {"paper_id": "", "paper_sections": paper}
+        for _ in range(repeat):
+            for mode, runner in (("fanout", run_fanout), ("combined", run_combined)):
+                started = time.perf_counter()
+                reviews = await runner(state)
+                elapsed = time.perf_counter() - started
+                results[mode].append({
+                    "paper": name,
+                    "seconds": elapsed,
+                    "input_tokens": _input_tokens(reviews),
+                    "scores": {aspect: reviews[key].get("score") for aspect, (key, _) in ASPECTS.items()},
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", help="papers to review")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per paper and mode")
+    args = parser.parse_args()
+
+    papers = {os.path.basename(path): parse_paper(clean_text(load_pdf_text(path))) for path in args.pdfs}
+    results = asyncio.run(benchmark(papers, args.repeat))
+
+    print(f"\n{'mode':<10} {'tokens/paper':>13} {'seconds/paper':>14}")
+    for mode, runs in results.items():
+        print(
+            f"{mode:<10} {statistics.mean(r['input_tokens'] for r in runs):>13.0f} "
+            f"{statistics.mean(r['seconds'] for r in runs):>14.2f}"
+        )
+    fanout_tokens = statistics.mean(r["input_tokens"] for r in results["fanout"])
+    combined_tokens = statistics.mean(r["input_tokens"] for r in results["combined"])
+    if combined_tokens:
+        print(f"input token reduction: {fanout_tokens / combined_tokens:.2f}x")
+
+    print(f"\n{'aspect':<12} {'mean |diff|':>12} {'within 1pt':>11}")
+    for aspect in ASPECTS:
+        diffs = [
+            abs(float(f["scores"][aspect] or 0) - float(c["scores"][aspect] or 0))
+            for f, c in zip(results["fanout"], results["combined"])
+        ]
+        within = sum(diff <= 1 for diff in diffs) / len(diffs)
+        print(f"{aspect:<12} {statistics.mean(diffs):>12.2f} {within:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Micro-benchmark: precompiled heading matcher vs. the previous per-line parser.
+
+Run from backend/:
+    python -m benchmarks.section_parser_benchmark [--papers 50] [--lines 2000] [--repeat 3]
+
+Builds a deterministic corpus of synthetic papers (numbered, roman and
+"Section N" headings, synonyms, trailing colons, look-alike prose lines),
+checks that both parsers return identical sections for every paper and
+reports the best-of-N wall time for each.
+"""
+import argparse
+import random
+import time
+
+import app.services.section_parser as section_parser
+from app.services.section_parser import HEADER_MAP, HEADER_PATTERN, _normalize_heading
+
+WORDS = (
+    "we propose a method for learning representations of data the results show that "
+    "our approach improves over baselines in analysis experiments and evaluation"
+).split()
+
+
+def _legacy_classify_heading(line: str) -> str:
+    """Heading classification as implemented before the precompiled matcher."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 90:
+        return None
+
+    normalized = _normalize_heading(stripped)
+    canonical = HEADER_MAP.get(normalized)
+    if canonical:
+        return canonical
+
+    for header in sorted(HEADER_MAP.keys(), key=len, reverse=True):
+        if normalized.startswith(header + " "):
+            return HEADER_MAP[header]
+
+    match = HEADER_PATTERN.match(stripped)
+    if match:
+        return HEADER_MAP.get(match.group("header").lower())
+    return None
+
+
+def _heading_variant(rng: random.Random, header: str, number: int) -> str:
+    style = rng.randrange(7)
+    if style == 0:
+        return header.title()
+    if style == 1:
+        return f"{number} {header.title()}"
+    if style == 2:
+        return f"{number}.{rng.randint(1, 4)} {header}:"
+    if style == 3:
+        return f"{'IVX'[number % 3] * (1 + number % 2)}. {header.upper()}"
+    if style == 4:
+        return f"Section {number} {header.title()}"
+    if style == 5:
+        return f"{header.title()} and {rng.choice(WORDS)}"
+    return f"{header.title()}: {rng.choice(WORDS)} {rng.choice(WORDS)}"
+
+
+def build_corpus(papers: int, lines_per_paper: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    headers = list(HEADER_MAP)
+    corpus = []
+    for _ in range(papers):
+        lines = []
+        number = 1
+        for _ in range(lines_per_paper):
+            roll = rng.random()
+            if roll < 0.02:
+                lines.append(_heading_variant(rng, rng.choice(headers), number))
+                number += 1
+            elif roll < 0.05:
+                # Prose that starts like a heading but is too long or punctuated
+                lines.append(f"{rng.choice(headers).title()}, " + " ".join(rng.choices(WORDS, k=20)))
+            elif roll < 0.1:
+                lines.append("")
+            else:
+                lines.append(" ".join(rng.choices(WORDS, k=rng.randint(3, 18))))
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+def _run(corpus: list[str], classify, repeat: int) -> tuple[float, list[dict]]:
+    original = section_parser._classify_heading
+    section_parser._classify_heading = classify
+    try:
+        best = float("inf")
+        results = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = [section_parser.parse_sections(text) for text in corpus]
+            best = min(best, time.perf_counter() - started)
+        return best, results
+    finally:
+        section_parser._classify_heading = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.papers, args.lines)
+    total_lines = sum(text.count("\n") + 1 for text in corpus)
+
+    line_mismatches = sum(
+        1
+        for text in corpus
+        for line in text.splitlines()
+        if _legacy_classify_heading(line) != section_parser._classify_heading(line)
+    )
+
+    legacy_time, legacy_results = _run(corpus, _legacy_classify_heading, args.repeat)
+    current_time, current_results = _run(corpus, section_parser._classify_heading, args.repeat)
+    paper_mismatches = sum(1 for a, b in zip(legacy_results, current_results) if a != b)
+
+    print("=" * 80)
+    print(f"Corpus: {len(corpus)} papers, {total_lines} lines")
+    print(f"Heading classification mismatches: {line_mismatches} lines, {paper_mismatches} papers")
+    print(f"Legacy parser:      {legacy_time * 1000:9.1f} ms ({legacy_time / total_lines * 1e6:.2f} us/line)")
+    print(f"Precompiled parser: {current_time * 1000:9.1f} ms ({current_time / total_lines * 1e6:.2f} us/line)")
+    print(f"Speedup: {legacy_time / current_time:.1f}x")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
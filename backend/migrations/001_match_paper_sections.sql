@@ -0,0 +1,33 @@
+-- Server-side top-k similarity search over paper_sections (pgvector).
+-- Used by app.services.retrieval when SIMILARITY_SEARCH_MODE=rpc.
+
+create extension if not exists vector;
+
+-- Approximate index for cosine distance (<=>); requires pgvector >= 0.5
+create index if not exists paper_sections_embedding_cosine_idx
+    on paper_sections using hnsw (embedding vector_cosine_ops);
+
+create or replace function match_paper_sections(
+    query_embedding vector,
+    match_count int default 5,
+    exclude_paper_id uuid default null
+)
+returns table (
+    id uuid,
+    paper_id uuid,
+    content text,
+    similarity double precision
+)
+language sql stable
+as $$
+    select
+        s.id,
+        s.paper_id,
+        s.content,
+        1 - (s.embedding <=> query_embedding) as similarity
+    from paper_sections s
+    where s.embedding is not null
+      and (exclude_paper_id is null or s.paper_id <> exclude_paper_id)
+    order by s.embedding <=> query_embedding
+    limit match_count;
+$$;
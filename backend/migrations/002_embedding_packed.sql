@@ -0,0 +1,5 @@
+-- Packed binary copy of each section embedding (see app/services/embedding_codec.py).
+-- Written when EMBEDDING_STORAGE_FORMAT is float32/float16/int8 and preferred by the
+-- similarity index loader, which decodes it without per-row JSON parsing.
+
+alter table paper_sections add column if not exists embedding_packed text;
@@ -0,0 +1,33 @@
+-- Section-type filter for match_paper_sections (see app.services.retrieval.search_similar_sections).
+-- Replaces the function from 001: the extra argument changes its signature.
+
+drop function if exists match_paper_sections(vector, int, uuid);
+
+create or replace function match_paper_sections(
+    query_embedding vector,
+    match_count int default 5,
+    exclude_paper_id uuid default null,
+    section_names text[] default null
+)
+returns table (
+    id uuid,
+    paper_id uuid,
+    section_name text,
+    content text,
+    similarity double precision
+)
+language sql stable
+as $$
+    select
+        s.id,
+        s.paper_id,
+        s.section_name,
+        s.content,
+        1 - (s.embedding <=> query_embedding) as similarity
+    from paper_sections s
+    where s.embedding is not null
+      and (exclude_paper_id is null or s.paper_id <> exclude_paper_id)
+      and (section_names is null or s.section_name = any(section_names))
+    order by s.embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from app.services.embedding_codec import decode_embedding, decode_embeddings, encode_embedding
+
+
+@pytest.mark.parametrize("value", ["[0.1,0.2,0.3]", "[0.1, 0.2, 0.3]", "0.1,0.2,0.3", [0.1, 0.2, 0.3]])
+def test_decode_well_formed(value):
+    np.testing.assert_allclose(decode_embedding(value), [0.1, 0.2, 0.3], rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["[0.1, 0.2, ]", "[0.1,0.2,]", "0.1,0.2,", "[0.1,,0.2]", "[0.1,abc]", "[]", "[nan,0.1]", "", "[0.1 0.2]"],
+)
+def test_decode_rejects_malformed_text(value):
+    assert decode_embedding(value) is None
+
+
+def test_decode_rejects_wrong_dimension():
+    assert decode_embedding("[0.1,0.2]", dim=3) is None
+    assert decode_embedding(encode_embedding([0.1, 0.2]), dim=3) is None
+    assert decode_embedding("[0.1,0.2,0.3]", dim=3) is not None
+
+
+def test_bulk_decode_rejects_malformed_and_truncated_rows():
+    values = ["[0.1,0.2,0.3]", "[0.4, 0.5, ]", "[0.6,0.7]", encode_embedding([1.0, 2.0, 3.0]), "[0.8,0.9,1.0]"]
+
+    decoded = decode_embeddings(values, dim=3)
+
+    np.testing.assert_allclose(decoded[0], [0.1, 0.2, 0.3], rtol=1e-6)
+    assert decoded[1] is None
+    assert decoded[2] is None
+    np.testing.assert_allclose(decoded[3], [1.0, 2.0, 3.0])
+    np.testing.assert_allclose(decoded[4], [0.8, 0.9, 1.0], rtol=1e-6)
+
+
+def test_bulk_decode_trailing_comma_does_not_shift_rows():
+    decoded = decode_embeddings(["[0.1,0.2,]", "[0.3,0.4,0.5]"])
+
+    assert decoded[0] is None
+    np.testing.assert_allclose(decoded[1], [0.3, 0.4, 0.5], rtol=1e-6)
@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from app.services import job_queue
+from app.services.job_queue import JobQueue, report_progress
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def test_claim_leases_job_to_one_worker(queue):
+    job_id = queue.enqueue("ingest_paper", {"paper_id": "p1"}, paper_id="p1")
+
+    job = queue.claim("worker-a", visibility_timeout=60)
+
+    assert job["id"] == job_id
+    assert job["payload"] == {"paper_id": "p1"}
+    assert job["attempts"] == 1
+    assert job["worker_id"] == "worker-a"
+    assert queue.get(job_id)["status"] == "running"
+    # A leased job is not handed to anyone else
+    assert queue.claim("worker-b", visibility_timeout=60) is None
+
+    queue.complete(job_id, "worker-a")
+    assert queue.get(job_id)["status"] == "completed"
+    assert queue.claim("worker-b", visibility_timeout=60) is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = queue.enqueue("ingest_paper", {}, max_attempts=3)
+    queue.claim("worker-a", visibility_timeout=0.05)
+    time.sleep(0.1)
+
+    job = queue.claim("worker-b", visibility_timeout=60)
+
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    assert queue.get(job_id)["worker_id"] == "worker-b"
+    # The worker that lost the lease can no longer finish the job
+    queue.complete(job_id, "worker-a")
+    assert queue.get(job_id)["status"] == "running"
+
+
+def test_heartbeat_keeps_lease(queue):
+    job_id = queue.enqueue("ingest_paper", {})
+    queue.claim("worker-a", visibility_timeout=0.2)
+    time.sleep(0.1)
+    assert queue.heartbeat(job_id, "worker-a", visibility_timeout=60)
+    time.sleep(0.15)
+
+    assert queue.claim("worker-b", visibility_timeout=60) is None
+
+
+def test_worker_learns_it_lost_the_lease(queue):
+    job_id = queue.enqueue("ingest_paper", {})
+    queue.claim("worker-a", visibility_timeout=0.05)
+    time.sleep(0.1)
+    queue.claim("worker-b", visibility_timeout=60)
+
+    assert not queue.heartbeat(job_id, "worker-a", visibility_timeout=60)
+    assert not queue.update_progress(job_id, "storing", 60, "worker-a")
+    assert queue.get(job_id)["stage"] != "storing"
+    assert queue.update_progress(job_id, "storing", 60, "worker-b")
+
+
+def test_job_that_lost_its_lease_stops_at_next_stage(queue, monkeypatch):
+    job_id = queue.enqueue("ingest_paper", {}, max_attempts=3)
+    stages = []
+
+    def handler(job):
+        report_progress(job["id"], "extracting", 10)
+        stages.append("extracting")
+        # The lease runs out mid-job and another worker picks the job up
+        time.sleep(0.1)
+        queue.claim("worker-b", visibility_timeout=60)
+        report_progress(job["id"], "storing", 60)
+        stages.append("storing")
+
+    monkeypatch.setattr(job_queue, "_resolve_handler", lambda kind: handler)
+    job = queue.claim("worker-a", visibility_timeout=0.05)
+    job_queue._run_job(queue, job, "worker-a", visibility_timeout=0.05)
+
+    assert stages == ["extracting"]
+    job = queue.get(job_id)
+    assert job["status"] == "running"
+    assert job["worker_id"] == "worker-b"
+    assert job["stage"] == "extracting"
+    assert job["error"] is None
+    assert job_id not in job_queue._leases
+
+
+def test_failed_job_is_retried_until_attempts_run_out(queue):
+    job_id = queue.enqueue("ingest_paper", {}, max_attempts=2)
+
+    job = queue.claim("worker-a", visibility_timeout=60)
+    queue.fail(job["id"], "worker-a", "first error")
+    requeued = queue.get(job_id)
+    assert requeued["status"] == "queued"
+    assert requeued["error"] == "first error"
+
+    job = queue.claim("worker-a", visibility_timeout=60)
+    assert job["attempts"] == 2
+    queue.fail(job["id"], "worker-a", "second error")
+
+    failed = queue.get(job_id)
+    assert failed["status"] == "failed"
+    assert failed["stage"] == "failed"
+    assert failed["error"] == "second error"
+    assert queue.claim("worker-a", visibility_timeout=60) is None
+
+
+def test_expired_lease_on_final_attempt_fails_job(queue):
+    job_id = queue.enqueue("ingest_paper", {}, max_attempts=1)
+    queue.claim("worker-a", visibility_timeout=0.05)
+    time.sleep(0.1)
+
+    assert queue.claim("worker-b", visibility_timeout=60) is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "Lease expired after final attempt"
+
+
+def test_claims_follow_priority_then_age(queue):
+    low = queue.enqueue("ingest_paper", {}, priority=0)
+    time.sleep(0.01)
+    high = queue.enqueue("ingest_paper", {}, priority=5)
+    time.sleep(0.01)
+    older_mid = queue.enqueue("ingest_paper", {}, priority=1)
+    time.sleep(0.01)
+    newer_mid = queue.enqueue("ingest_paper", {}, priority=1)
+
+    claimed = [queue.claim("worker-a", visibility_timeout=60)["id"] for _ in range(4)]
+
+    assert claimed == [high, older_mid, newer_mid, low]
+    assert queue.counts() == {"running": 4}
@@ -0,0 +1,23 @@
+from app.services.prompt_budget import TRIM_MARKER, count_tokens, trim_to_tokens
+
+TEXT = "First sentence here. Second one follows.\n\nNew paragraph starts. And more text goes on here."
+
+
+def test_trim_keeps_whole_text_within_budget():
+    assert trim_to_tokens(TEXT, count_tokens(TEXT)) == TEXT
+
+
+def test_trim_cuts_at_sentence_and_keeps_paragraph_breaks():
+    budget = count_tokens("First sentence here. Second one follows. New paragraph starts.") + count_tokens(TRIM_MARKER)
+
+    trimmed = trim_to_tokens(TEXT, budget)
+
+    assert trimmed == "First sentence here. Second one follows.\n\nNew paragraph starts." + TRIM_MARKER
+    assert count_tokens(trimmed) <= budget
+
+
+def test_trim_falls_back_to_words_for_one_long_sentence():
+    text = "alpha beta\ngamma " + " ".join(["delta"] * 20)
+    budget = count_tokens("alpha beta gamma") + count_tokens(TRIM_MARKER)
+
+    assert trim_to_tokens(text, budget) == "alpha beta\ngamma" + TRIM_MARKER